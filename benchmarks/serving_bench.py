@@ -0,0 +1,247 @@
+"""Load-test and latency benchmark for the fraud API and the realtime scorer.
+
+Drives the fraud API with transactions sampled from the fraud demo's
+dataset (``fraud_detection/demo/results/synthetic_data.csv``, regenerated
+in memory when absent) and the realtime scorer with events from
+``realtime_ml_system/demo/stream_simulator.stream_events``, and writes
+throughput + latency percentiles as JSON, tagged with the git commit so runs
+on the same box can be compared across commits.
+
+Targets:
+- ``fraud``    — ``fraud_detection/serve/app.py``; in-process over ASGI by
+                 default, or a running server with ``--url``
+- ``realtime`` — ``ScoringApp.post_score`` from ``online_inference.py``,
+                 called from a thread pool
+
+Load model:
+- ``--rate R``  open loop: request *i* is due at ``start + i / R``; latency is
+  measured from the due time, so queueing behind slow requests is counted
+  (no coordinated omission).  ``--concurrency`` caps requests in flight.
+- ``--rate 0``  closed loop: ``--concurrency`` clients send back-to-back.
+
+Usage (from the repo root):
+    python benchmarks/serving_bench.py fraud --requests 5000 --concurrency 32 --rate 2000
+    python benchmarks/serving_bench.py fraud --batch-size 500 --requests 200
+    python benchmarks/serving_bench.py realtime --requests 5000 --concurrency 4
+    python benchmarks/serving_bench.py fraud --out new.json --compare baseline.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "fraud_detection"))
+sys.path.insert(0, str(ROOT / "fraud_detection" / "demo"))
+sys.path.insert(0, str(ROOT / "realtime_ml_system" / "demo"))
+
+from stream_simulator import stream_events  # noqa: E402
+
+from generate_synthetic import generate_dataset  # noqa: E402
+
+FRAUD_DATA = ROOT / "fraud_detection" / "demo" / "results" / "synthetic_data.csv"
+
+PERCENTILES = (50, 90, 95, 99, 99.9)
+
+
+# ---------------------------------------------------------------------------
+# Reporting
+# ---------------------------------------------------------------------------
+
+
+def summarize(latencies_ms: list[float], n_errors: int, duration_s: float, rows_per_request: int) -> dict:
+    lat = np.asarray(latencies_ms, dtype=float)
+    n_ok = len(lat)
+    latency = {"mean": round(float(lat.mean()), 4), "max": round(float(lat.max()), 4)} if n_ok else {}
+    for p in PERCENTILES:
+        if n_ok:
+            latency[f"p{p:g}"] = round(float(np.percentile(lat, p)), 4)
+    return {
+        "requests": n_ok + n_errors,
+        "errors": n_errors,
+        "duration_s": round(duration_s, 4),
+        "throughput_rps": round(n_ok / duration_s, 2) if duration_s else 0.0,
+        "rows_per_s": round(n_ok * rows_per_request / duration_s, 2) if duration_s else 0.0,
+        "latency_ms": latency,
+    }
+
+
+def environment() -> dict:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True
+        ).stdout.strip()
+    except OSError:
+        commit = ""
+    return {
+        "git_commit": commit or None,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+def compare(current: dict, baseline: dict) -> list[str]:
+    """Human-readable % change per metric (positive = higher than baseline)."""
+    lines = []
+    pairs = [("throughput_rps", current, baseline)] + [
+        (f"latency {k}", current["latency_ms"], baseline["latency_ms"]) for k in current["latency_ms"]
+    ]
+    for label, cur, base in pairs:
+        key = label.split()[-1]
+        if key in base and base[key]:
+            change = (cur[key] - base[key]) / base[key] * 100
+            lines.append(f"  {label:<18} {base[key]:>12.4f} → {cur[key]:>12.4f}  ({change:+.1f}%)")
+    return lines
+
+
+# ---------------------------------------------------------------------------
+# Load generation
+# ---------------------------------------------------------------------------
+
+
+async def _drive(send, n_requests: int, concurrency: int, rate: float) -> tuple[list[float], int, float]:
+    """Run ``send(i)`` n_requests times under the chosen load model."""
+    latencies, errors = [], 0
+    sem = asyncio.Semaphore(concurrency)
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+
+    async def one(i: int) -> None:
+        nonlocal errors
+        due = start + i / rate if rate > 0 else None
+        if due is not None:
+            await asyncio.sleep(max(0.0, due - loop.time()))
+        async with sem:
+            t0 = due if due is not None else loop.time()
+            try:
+                await send(i)
+            except Exception:
+                errors += 1
+                return
+            latencies.append((loop.time() - t0) * 1000)
+
+    await asyncio.gather(*(one(i) for i in range(n_requests)))
+    return latencies, errors, loop.time() - start
+
+
+def _payloads(
+    n_requests: int, batch_size: int, seed: int, feature_cols: list[str]
+) -> list[list[dict]]:
+    """Feature dicts sampled (with replacement) from the fraud dataset's rows.
+
+    Only the served model's ``feature_cols`` are sent, so every column the
+    dataset provides is parsed and scored rather than median-imputed.
+    """
+    data = pd.read_csv(FRAUD_DATA) if FRAUD_DATA.exists() else generate_dataset(seed=seed)
+    cols = [c for c in feature_cols if c in data.columns]
+    if not cols:
+        raise ValueError(f"None of the model's features are in the fraud dataset: {feature_cols}")
+    rows = data[cols].sample(n_requests * batch_size, replace=True, random_state=seed)
+    events = rows.to_dict("records")
+    return [events[i : i + batch_size] for i in range(0, len(events), batch_size)]
+
+
+async def bench_fraud(args) -> dict:
+    import httpx
+
+    if args.url:
+        client = httpx.AsyncClient(base_url=args.url, timeout=30.0)
+    else:
+        from serve.app import app  # loads the artefact (see FRAUD_* env vars)
+
+        client = httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=30.0
+        )
+
+    batches: list[list[dict]] = []
+
+    async def send(i: int) -> None:
+        if args.batch_size == 1:
+            resp = await client.post("/predict", json={"features": batches[i][0]})
+        else:
+            resp = await client.post("/predict/batch", json={"features": batches[i]})
+        resp.raise_for_status()
+
+    async with client:
+        feature_cols = (await client.get("/health")).json()["feature_cols"]
+        batches += _payloads(args.requests, args.batch_size, args.seed, feature_cols)
+        for i in range(min(args.warmup, len(batches))):
+            await send(i)
+        latencies, errors, duration = await _drive(send, len(batches), args.concurrency, args.rate)
+    return summarize(latencies, errors, duration, args.batch_size)
+
+
+async def bench_realtime(args) -> dict:
+    from realtime_ml_system.demo.online_inference import MetricsLogger, ScoringApp, batch_train
+    from stream_simulator import generate_feature_store
+
+    events = list(stream_events(n_events=args.requests, seed=args.seed))
+    db_path = Path(tempfile.mkdtemp(prefix="rt-bench-")) / "metrics.db"
+    app = ScoringApp(batch_train(), generate_feature_store(), MetricsLogger(db_path))
+    pool = ThreadPoolExecutor(args.concurrency)
+    loop = asyncio.get_running_loop()
+
+    async def send(i: int) -> None:
+        await loop.run_in_executor(pool, app.post_score, events[i])
+
+    for i in range(min(args.warmup, len(events))):
+        app.post_score(events[i])
+    latencies, errors, duration = await _drive(send, len(events), args.concurrency, args.rate)
+    pool.shutdown()
+    return summarize(latencies, errors, duration, 1)
+
+
+def main(argv: list[str] | None = None) -> dict:
+    parser = argparse.ArgumentParser(description="Serving load test / latency benchmark")
+    parser.add_argument("target", choices=["fraud", "realtime"])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--rate", type=float, default=0.0, help="requests/sec (0 = closed loop)")
+    parser.add_argument("--batch-size", type=int, default=1, help="rows per request (fraud only)")
+    parser.add_argument("--warmup", type=int, default=50)
+    parser.add_argument("--url", help="benchmark a running fraud server instead of in-process")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", help="write the JSON result here")
+    parser.add_argument("--compare", help="baseline JSON from a previous run")
+    args = parser.parse_args(argv)
+
+    runner = bench_fraud if args.target == "fraud" else bench_realtime
+    result = {
+        "target": args.target,
+        "config": {
+            k: getattr(args, k) for k in ("requests", "concurrency", "rate", "batch_size", "url", "seed")
+        },
+        "environment": environment(),
+        **asyncio.run(runner(args)),
+    }
+
+    print(json.dumps(result, indent=2))
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(result, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        print(f"\nvs {args.compare} (commit {baseline['environment'].get('git_commit')}):")
+        print("\n".join(compare(result, baseline)))
+    return result
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,22 @@
 """Data-drift detection, simulation, and reporting."""
 
-from .drift import psi, ks_drift_test, simulate_drift, drift_report
+from .categorical import CategoricalBinner, categorical_drift_report, categorical_drift_test
+from .drift import drift_report, ks_drift_test, psi, simulate_drift
+from .engine import drift_matrix
+from .monitor import DriftMonitor
+from .profile import ReferenceProfile
+from .streaming import DriftAccumulator
 
 __all__ = [
     "psi",
     "ks_drift_test",
     "simulate_drift",
     "drift_report",
+    "drift_matrix",
+    "categorical_drift_test",
+    "categorical_drift_report",
+    "CategoricalBinner",
+    "ReferenceProfile",
+    "DriftAccumulator",
+    "DriftMonitor",
 ]
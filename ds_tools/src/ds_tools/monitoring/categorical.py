@@ -0,0 +1,159 @@
+"""Drift metrics for categorical and high-cardinality features.
+
+:func:`psi` and :func:`ks_drift_test` work on numbers.  A raw categorical
+column — a ``merchant_id`` before :class:`FrequencyEncoder`, say — has no
+order to bin by quantile, and may hold millions of distinct values.  Here a
+:class:`CategoricalBinner` maps every value to one of a fixed number of
+buckets, fitted on the reference:
+
+- the ``top_k`` most frequent reference categories get a bucket each;
+- every other value (rare or never seen) lands in one of ``n_hash_buckets``
+  "other" buckets by ``pd.util.hash_array`` — a new merchant taking traffic
+  still shows up as one bucket filling, instead of vanishing into a single
+  catch-all;
+- missing values get the last bucket.
+
+Counting is one ``Index.get_indexer`` lookup, one hash and one
+``np.bincount`` per column, so state and memory are ``top_k +
+n_hash_buckets + 1`` counters per feature whatever the cardinality.  From
+the two count vectors come PSI (same formula as :func:`psi`), a chi-square
+test of homogeneity and the Jensen–Shannon divergence.
+"""
+
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+from scipy.special import rel_entr
+
+from .engine import psi_from_counts
+
+
+class CategoricalBinner:
+    """Top-K + hashed "other" bucketing of a categorical column.
+
+    Parameters
+    ----------
+    top_k : int — most frequent reference categories kept as their own bucket
+    n_hash_buckets : int — buckets shared by all other values
+    hash_key : str — 16-character key for ``pd.util.hash_array``
+    """
+
+    def __init__(
+        self, top_k: int = 100, n_hash_buckets: int = 32, hash_key: str = "0123456789123456"
+    ):
+        self.top_k = top_k
+        self.n_hash_buckets = n_hash_buckets
+        self.hash_key = hash_key
+
+    @property
+    def n_buckets(self) -> int:
+        return len(self.categories_) + self.n_hash_buckets + 1
+
+    def fit(self, reference) -> CategoricalBinner:
+        codes, uniques = pd.factorize(np.asarray(reference, dtype=object), use_na_sentinel=True)
+        counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+        # Most frequent first; ties keep first-seen order, so fits are reproducible
+        order = np.argsort(-counts, kind="stable")[: self.top_k]
+        self.categories_ = pd.Index(uniques[order])
+        self.n_categories_ = len(uniques)
+        return self
+
+    def transform(self, values) -> np.ndarray:
+        """Bucket index per value: top categories, then hashed others, then missing."""
+        values = np.asarray(values, dtype=object)
+        k = len(self.categories_)
+        buckets = self.categories_.get_indexer(values)
+        other = buckets < 0
+        if other.any():
+            hashed = pd.util.hash_array(values[other], hash_key=self.hash_key)
+            buckets[other] = k + (hashed % np.uint64(self.n_hash_buckets)).astype(np.int64)
+            buckets[other & pd.isna(values)] = self.n_buckets - 1
+        return buckets
+
+    def counts(self, values) -> np.ndarray:
+        """Rows per bucket — counts from several chunks add up."""
+        return np.bincount(self.transform(values), minlength=self.n_buckets)
+
+
+def _chi2_homogeneity(ref_counts: np.ndarray, cur_counts: np.ndarray) -> tuple[float, float]:
+    table = np.vstack([ref_counts, cur_counts]).astype(float)
+    table = table[:, table.sum(axis=0) > 0]
+    if table.shape[1] < 2 or (table.sum(axis=1) == 0).any():
+        return 0.0, 1.0
+    expected = table.sum(axis=1, keepdims=True) * table.sum(axis=0) / table.sum()
+    statistic = float(((table - expected) ** 2 / expected).sum())
+    return statistic, float(stats.chi2.sf(statistic, table.shape[1] - 1))
+
+
+def _js_divergence(ref_counts: np.ndarray, cur_counts: np.ndarray) -> float:
+    p = ref_counts / ref_counts.sum()
+    q = cur_counts / cur_counts.sum()
+    m = (p + q) / 2
+    return float((rel_entr(p, m).sum() + rel_entr(q, m).sum()) / (2 * np.log(2)))
+
+
+def categorical_drift_test(
+    reference,
+    current,
+    top_k: int = 100,
+    n_hash_buckets: int = 32,
+    threshold: float = 0.05,
+    eps: float = 1e-4,
+) -> dict:
+    """PSI, chi-square and Jensen–Shannon drift between two categorical samples.
+
+    Returns
+    -------
+    dict with 'psi', 'chi2_statistic', 'p_value', 'js_divergence' (base 2,
+    in [0, 1]), 'is_drift' (chi-square p-value below ``threshold``) and
+    'n_ref_categories'
+    """
+    binner = CategoricalBinner(top_k, n_hash_buckets).fit(reference)
+    ref_counts, cur_counts = binner.counts(reference), binner.counts(current)
+    statistic, p_value = _chi2_homogeneity(ref_counts, cur_counts)
+    return {
+        "psi": float(psi_from_counts(ref_counts[None], cur_counts[None], eps)[0]),
+        "chi2_statistic": statistic,
+        "p_value": p_value,
+        "js_divergence": _js_divergence(ref_counts, cur_counts),
+        "is_drift": p_value < threshold,
+        "n_ref_categories": binner.n_categories_,
+    }
+
+
+def categorical_drift_report(
+    reference_df: pd.DataFrame,
+    current_df: pd.DataFrame,
+    features: list[str],
+    top_k: int = 100,
+    n_hash_buckets: int = 32,
+) -> pd.DataFrame:
+    """Drift report for categorical features, in the style of :func:`drift_report`.
+
+    Returns a DataFrame sorted by PSI (descending) with columns:
+    feature, psi, psi_alert, chi2_statistic, chi2_p_value, chi2_drift,
+    js_divergence, n_ref_categories.
+    """
+    rows = []
+    for feat in features:
+        result = categorical_drift_test(
+            reference_df[feat], current_df[feat], top_k=top_k, n_hash_buckets=n_hash_buckets
+        )
+        rows.append(
+            {
+                "feature": feat,
+                "psi": round(result["psi"], 4),
+                "chi2_statistic": round(result["chi2_statistic"], 4),
+                "chi2_p_value": result["p_value"],
+                "chi2_drift": result["is_drift"],
+                "js_divergence": round(result["js_divergence"], 4),
+                "n_ref_categories": result["n_ref_categories"],
+            }
+        )
+    report = pd.DataFrame(rows)
+    psi_val = report["psi"].to_numpy()
+    alert = np.select([psi_val >= 0.2, psi_val >= 0.1], ["HIGH", "MEDIUM"], "LOW")
+    report.insert(2, "psi_alert", alert)
+    return report.sort_values("psi", ascending=False).reset_index(drop=True)
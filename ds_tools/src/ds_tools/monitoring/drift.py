@@ -8,7 +8,8 @@ module provides:
 - **KS test** — non-parametric two-sample test.
 - **simulate_drift** — artificially inject distributional changes into a
   DataFrame so you can *demonstrate* monitoring without a live system.
-- **drift_report** — multi-feature summary table with alerts.
+- **drift_report** — multi-feature summary table with alerts, computed by
+  the vectorised matrix engine in :mod:`.engine`.
 """
 
 from __future__ import annotations
@@ -17,6 +18,8 @@ import numpy as np
 import pandas as pd
 from scipy import stats
 
+from .engine import drift_matrix
+from .profile import ReferenceProfile
 
 # ---------------------------------------------------------------------------
 # PSI
@@ -146,41 +149,53 @@ def simulate_drift(
 
 
 def drift_report(
-    reference_df: pd.DataFrame,
+    reference_df: pd.DataFrame | ReferenceProfile,
     current_df: pd.DataFrame,
     features: list[str],
     n_bins: int = 10,
+    n_jobs: int | None = None,
 ) -> pd.DataFrame:
     """Generate a drift report for multiple features.
 
+    All features are scored together by :func:`~ds_tools.monitoring.engine.drift_matrix`
+    (same PSI bins and KS statistic as :func:`psi` / :func:`ks_drift_test`;
+    NaNs are dropped per feature).  ``n_jobs`` spreads feature blocks over a
+    process pool.
+
+    ``reference_df`` may instead be a fitted :class:`ReferenceProfile`; the
+    report then needs only the current window (``n_bins`` comes from the
+    profile, and KS p-values are asymptotic).
+
     Returns a DataFrame sorted by PSI (descending) with columns:
     feature, psi, psi_alert, ks_statistic, ks_p_value, ks_drift,
     ref_mean, cur_mean, mean_shift_pct.
     """
-    rows = []
-    for feat in features:
-        ref = reference_df[feat].dropna().values
-        cur = current_df[feat].dropna().values
-
-        psi_val = psi(ref, cur, n_bins=n_bins)
-        ks = ks_drift_test(ref, cur)
-
-        rows.append(
-            {
-                "feature": feat,
-                "psi": round(psi_val, 4),
-                "psi_alert": (
-                    "HIGH" if psi_val >= 0.2 else "MEDIUM" if psi_val >= 0.1 else "LOW"
-                ),
-                "ks_statistic": round(ks["statistic"], 4),
-                "ks_p_value": ks["p_value"],
-                "ks_drift": ks["is_drift"],
-                "ref_mean": round(float(ref.mean()), 4),
-                "cur_mean": round(float(cur.mean()), 4),
-                "mean_shift_pct": round(
-                    (cur.mean() - ref.mean()) / (abs(ref.mean()) + 1e-10) * 100, 2
-                ),
-            }
-        )
-
-    return pd.DataFrame(rows).sort_values("psi", ascending=False).reset_index(drop=True)
+    if isinstance(reference_df, ReferenceProfile):
+        result = reference_df.compare(current_df[features], features=features)
+        return _report_frame(features, result)
+
+    result = drift_matrix(
+        reference_df[features], current_df[features], n_bins=n_bins, n_jobs=n_jobs
+    )
+    return _report_frame(features, result)
+
+
+def _report_frame(features: list[str], result: dict[str, np.ndarray]) -> pd.DataFrame:
+    def rounded(values, ndigits):  # builtin round, as the per-feature report used
+        return [round(float(v), ndigits) for v in values]
+
+    psi_val, ref_mean, cur_mean = result["psi"], result["ref_mean"], result["cur_mean"]
+    report = pd.DataFrame(
+        {
+            "feature": list(features),
+            "psi": rounded(psi_val, 4),
+            "psi_alert": np.select([psi_val >= 0.2, psi_val >= 0.1], ["HIGH", "MEDIUM"], "LOW"),
+            "ks_statistic": rounded(result["ks_statistic"], 4),
+            "ks_p_value": result["ks_p_value"],
+            "ks_drift": result["ks_p_value"] < 0.05,
+            "ref_mean": rounded(ref_mean, 4),
+            "cur_mean": rounded(cur_mean, 4),
+            "mean_shift_pct": rounded((cur_mean - ref_mean) / (np.abs(ref_mean) + 1e-10) * 100, 2),
+        }
+    )
+    return report.sort_values("psi", ascending=False).reset_index(drop=True)
@@ -0,0 +1,213 @@
+"""Continuous drift monitoring over a sliding window of live events.
+
+:func:`drift_report` and :class:`DriftAccumulator` score a finished window.
+A :class:`DriftMonitor` is fed every scored event and keeps, per feature,
+counts over the reference profile's PSI bins in a ring of ``n_slots``
+sub-windows (slots):
+
+- each event adds one count per feature to the current slot and to a
+  running window total — constant work, no raw values kept;
+- when a slot fills (``window_events / n_slots`` events, or
+  ``window_s / n_slots`` seconds of event time) the monitor *ticks*: it
+  computes PSI per feature from the window total against the profile's
+  reference proportions, records the alert level, then drops the oldest
+  slot by subtracting it from the total.
+
+Memory is ``n_slots × features × bins`` counters whatever the event rate,
+and the window slides by one slot per tick, so a shift shows up within one
+slot's worth of traffic instead of at the next batch report.
+"""
+
+from __future__ import annotations
+
+from collections import deque
+from collections.abc import Callable
+
+import numpy as np
+
+from .engine import psi_from_counts
+from .profile import ReferenceProfile
+
+ALERT_LEVELS = ("LOW", "MEDIUM", "HIGH")
+
+
+class DriftMonitor:
+    """Sliding-window PSI per feature, updated one event at a time.
+
+    Parameters
+    ----------
+    reference : ReferenceProfile, or a DataFrame / array to fit one from
+    features : list[str] — features to monitor (default: all of the profile's);
+        :meth:`update` takes values in this order
+    window_events : int — count-based window length (default 10 000)
+    window_s : float — time-based window length in seconds, instead; slots
+        follow event time, so every update must carry a timestamp
+    n_slots : int — ring slots per window; the window slides one slot per tick
+    thresholds : (medium, high) — PSI alert thresholds, as in :func:`drift_report`
+    on_tick : callable(dict) — called with every tick's snapshot
+    history : int — snapshots kept in :attr:`ticks`
+    """
+
+    def __init__(
+        self,
+        reference,
+        features: list[str] | None = None,
+        window_events: int | None = None,
+        window_s: float | None = None,
+        n_slots: int = 10,
+        thresholds: tuple[float, float] = (0.1, 0.2),
+        on_tick: Callable[[dict], None] | None = None,
+        history: int = 100,
+        eps: float = 1e-4,
+    ):
+        if window_events is not None and window_s is not None:
+            raise ValueError("Give either window_events or window_s, not both")
+        if not isinstance(reference, ReferenceProfile):
+            reference = ReferenceProfile.fit(reference, features)
+        self.profile = reference
+        self.features = list(features) if features is not None else list(reference.features)
+        idx = [reference.features.index(f) for f in self.features]
+        self._edges = reference.edges[idx]
+        self._ref = reference.proportions[idx]
+
+        self.window_s = window_s
+        self.window_events = None if window_s is not None else (window_events or 10_000)
+        self.n_slots = n_slots
+        if self.window_events is not None:
+            self._slot_events = max(self.window_events // n_slots, 1)
+        else:
+            self._slot_s = window_s / n_slots
+        self.thresholds = thresholds
+        self.on_tick = on_tick
+        self.eps = eps
+
+        k, n_bins = self._ref.shape
+        self._slots = np.zeros((n_slots, k, n_bins), dtype=np.int64)
+        self._window = np.zeros((k, n_bins), dtype=np.int64)
+        self._cols = np.arange(k)
+        self._slot = 0
+        self._in_slot = 0
+        self._slot_end: float | None = None
+        self.last_timestamp: float | None = None
+        self.events = 0
+        self.n_ticks = 0
+        self.ticks: deque[dict] = deque(maxlen=history)
+
+    # ------------------------------------------------------------------
+    # Updates
+    # ------------------------------------------------------------------
+    def update(self, row, timestamp: float | None = None) -> dict | None:
+        """Add one event's feature values; returns the tick snapshot if one fired.
+
+        ``timestamp`` (event time, epoch seconds) drives time-based windows,
+        which raise ``ValueError`` without one.
+        """
+        if self.window_s is not None and timestamp is None:
+            raise ValueError("A time-based DriftMonitor needs an event timestamp per row")
+        if timestamp is not None:
+            self.last_timestamp = timestamp
+        fired = self._advance_to(timestamp) if self.window_s is not None else None
+        values = np.asarray(row, dtype=float)
+        valid = ~np.isnan(values)
+        bins = (values[:, None] >= self._edges).sum(axis=1)
+        cols, bins = self._cols[valid], bins[valid]
+        self._slots[self._slot, cols, bins] += 1
+        self._window[cols, bins] += 1
+        self.events += 1
+        self._in_slot += 1
+        if self.window_events is not None and self._in_slot >= self._slot_events:
+            fired = self._tick()
+        return fired
+
+    def update_batch(self, rows, timestamps=None) -> list[dict]:
+        """Add many events (rows in :attr:`features` order); returns the ticks fired.
+
+        ``timestamps`` must be non-decreasing, as event time from one stream is;
+        missing ones (None / NaN) raise ``ValueError`` on a time-based window.
+        """
+        rows = np.asarray(rows, dtype=float).reshape(-1, len(self.features))
+        if timestamps is not None:
+            timestamps = np.asarray(timestamps, dtype=float)
+        if self.window_s is not None and (timestamps is None or np.isnan(timestamps).any()):
+            raise ValueError("A time-based DriftMonitor needs an event timestamp per row")
+        fired = []
+        start = 0
+        while start < len(rows):
+            if self.window_s is not None:
+                self.last_timestamp = float(timestamps[start])
+                tick = self._advance_to(self.last_timestamp)
+                if tick is not None:
+                    fired.append(tick)
+                # Event time is non-decreasing: the slot ends at the first later timestamp
+                stop = int(np.searchsorted(timestamps, self._slot_end, side="left"))
+                stop = max(stop, start + 1)
+            else:
+                stop = min(start + self._slot_events - self._in_slot, len(rows))
+                if timestamps is not None and not np.isnan(timestamps[stop - 1]):
+                    self.last_timestamp = float(timestamps[stop - 1])
+            self._add_counts(rows[start:stop])
+            start = stop
+            if self.window_events is not None and self._in_slot >= self._slot_events:
+                fired.append(self._tick())
+        return fired
+
+    def _add_counts(self, rows: np.ndarray) -> None:
+        k, n_bins = self._window.shape
+        valid = ~np.isnan(rows)
+        bins = (rows[:, :, None] >= self._edges).sum(axis=2)
+        flat = (self._cols * n_bins + bins)[valid]
+        counts = np.bincount(flat, minlength=k * n_bins).reshape(k, n_bins)
+        self._slots[self._slot] += counts
+        self._window += counts
+        self.events += len(rows)
+        self._in_slot += len(rows)
+
+    def _advance_to(self, ts: float) -> dict | None:
+        """Tick through every slot boundary up to event time ``ts`` (time-based windows)."""
+        if self._slot_end is None:
+            self._slot_end = float((ts // self._slot_s + 1) * self._slot_s)
+            return None
+        if ts < self._slot_end:
+            return None
+        # The slot that just closed ticks if it saw events; empty slots after
+        # it only rotate — at most n_slots of them clear the whole window.
+        fired = self._tick() if self._in_slot else None
+        skipped = int((ts - self._slot_end) // self._slot_s)
+        for _ in range(min(skipped + (fired is None), self.n_slots)):
+            self._rotate()
+        self._slot_end += (skipped + 1) * self._slot_s
+        return fired
+
+    # ------------------------------------------------------------------
+    # Ticks
+    # ------------------------------------------------------------------
+    def psi(self) -> np.ndarray:
+        """Current PSI per feature over the window (NaN while it is empty)."""
+        psi = psi_from_counts(self._ref, self._window, self.eps)
+        return np.where(self._window.sum(axis=1) > 0, psi, np.nan)
+
+    def _tick(self) -> dict:
+        psi = self.psi()
+        medium, high = self.thresholds
+        levels = np.select([psi >= high, psi >= medium], [2, 1], 0)
+        snapshot = {
+            "tick": self.n_ticks,
+            "events": self.events,
+            "window_events": int(self._window.sum(axis=1).max(initial=0)),
+            "timestamp": self._slot_end if self.window_s is not None else self.last_timestamp,
+            "psi": dict(zip(self.features, np.round(psi, 4).tolist())),
+            "alert": {f: ALERT_LEVELS[level] for f, level in zip(self.features, levels)},
+            "max_alert": ALERT_LEVELS[int(levels.max(initial=0))],
+        }
+        self.n_ticks += 1
+        self.ticks.append(snapshot)
+        self._rotate()
+        if self.on_tick is not None:
+            self.on_tick(snapshot)
+        return snapshot
+
+    def _rotate(self) -> None:
+        self._slot = (self._slot + 1) % self.n_slots
+        self._window -= self._slots[self._slot]  # expire the oldest slot
+        self._slots[self._slot] = 0
+        self._in_slot = 0
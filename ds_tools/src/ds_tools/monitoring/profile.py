@@ -0,0 +1,258 @@
+"""Fitted reference profiles for drift monitoring.
+
+:func:`drift_report` on raw data recomputes the reference's quantile edges,
+sort and means on every call, so each monitoring host has to keep the full
+training sample in memory.  A :class:`ReferenceProfile` is fitted once and
+keeps only what the metrics need, per feature:
+
+- the PSI bin edges and reference bin proportions;
+- a compressed ECDF for KS — every distinct value when there are at most
+  ``max_knots`` of them (exact KS), otherwise ``max_knots`` points spaced
+  evenly in probability (KS within ``1 / (max_knots - 1)``);
+- count, missing count, mean, std, min and max.
+
+It saves to a compressed ``.npz`` file (a few tens of kB per feature at
+most) and :meth:`ReferenceProfile.compare` scores a current window against
+it with the same primitives as :func:`~ds_tools.monitoring.engine.drift_matrix`.
+
+Usage
+-----
+>>> profile = ReferenceProfile.fit(train_df, features)
+>>> profile.save("reference_profile.npz")
+>>> report = drift_report(ReferenceProfile.load("reference_profile.npz"), live_df, features)
+"""
+
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .engine import (
+    bin_counts,
+    ecdf,
+    feature_major,
+    ks_pvalues,
+    ks_statistic_ecdf,
+    psi_from_counts,
+    quantile_edges,
+    sort_features,
+)
+
+PROFILE_FORMAT = 1
+
+
+def _compress_ecdf(sorted_values: np.ndarray, max_knots: int) -> tuple[np.ndarray, np.ndarray]:
+    x, cdf = ecdf(sorted_values)
+    if len(x) > max_knots:
+        # Keep the first jump at or above each probability level
+        keep = np.unique(np.searchsorted(cdf, np.linspace(0, 1, max_knots), side="left"))
+        x, cdf = x[keep], cdf[keep]
+    return x, cdf
+
+
+class ReferenceProfile:
+    """Per-feature summary of a reference sample; enough to score drift without it.
+
+    Build one with :meth:`fit` or :meth:`load` rather than the constructor.
+    """
+
+    def __init__(
+        self,
+        features: list[str],
+        edges: np.ndarray,
+        proportions: np.ndarray,
+        knots: np.ndarray,
+        knot_cdf: np.ndarray,
+        n_knots: np.ndarray,
+        moments: dict[str, np.ndarray],
+    ):
+        self.features = list(features)
+        self.edges = edges
+        self.proportions = proportions
+        self.knots = knots
+        self.knot_cdf = knot_cdf
+        self.n_knots = n_knots
+        self.moments = moments
+
+    @property
+    def n_bins(self) -> int:
+        return self.proportions.shape[1]
+
+    # ------------------------------------------------------------------
+    # Fitting and serialisation
+    # ------------------------------------------------------------------
+    @classmethod
+    def fit(
+        cls,
+        reference,
+        features: list[str] | None = None,
+        n_bins: int = 10,
+        max_knots: int = 2048,
+        block_size: int = 64,
+    ) -> ReferenceProfile:
+        """Summarise a reference sample.
+
+        Parameters
+        ----------
+        reference : DataFrame or (n_rows, n_features) array
+        features : list[str] — columns to profile (DataFrame: default all;
+            array: names for its columns, default ``"f0"``, ``"f1"``, ...)
+        n_bins : int — PSI quantile bins, as in :func:`psi`
+        max_knots : int — ECDF points kept per feature
+        block_size : int — features sorted at a time (bounds memory)
+        """
+        if isinstance(reference, pd.DataFrame):
+            features = list(features) if features is not None else list(reference.columns)
+            values = feature_major(reference[features])
+        else:
+            values = feature_major(reference)
+            if features is None:
+                features = [f"f{j}" for j in range(len(values))]
+            features = list(features)
+        if len(features) != len(values):
+            raise ValueError(f"{len(features)} feature names for {len(values)} columns")
+
+        k = len(values)
+        edges = np.empty((k, n_bins - 1))
+        proportions = np.empty((k, n_bins))
+        knots = np.full((k, max_knots), np.inf)
+        knot_cdf = np.ones((k, max_knots))
+        n_knots = np.zeros(k, dtype=np.int64)
+        moments = {name: np.empty(k) for name in ("mean", "std", "min", "max")}
+        moments["n"] = np.empty(k, dtype=np.int64)
+        moments["n_missing"] = np.empty(k, dtype=np.int64)
+
+        for s in range(0, k, block_size):
+            block = slice(s, s + block_size)
+            sorted_rows, n_valid = sort_features(np.ascontiguousarray(values[block]))
+            edges[block] = quantile_edges(sorted_rows, n_valid, n_bins)
+            counts = bin_counts(sorted_rows, n_valid, edges[block])
+            with np.errstate(invalid="ignore", divide="ignore"):
+                proportions[block] = counts / n_valid[:, None]
+            for i, row in enumerate(sorted_rows):
+                j, n = s + i, n_valid[i]
+                x, cdf = _compress_ecdf(row[:n], max_knots)
+                knots[j, : len(x)], knot_cdf[j, : len(x)], n_knots[j] = x, cdf, len(x)
+                moments["mean"][j] = row[:n].mean() if n else np.nan
+                moments["std"][j] = row[:n].std() if n else np.nan
+                moments["min"][j] = row[0] if n else np.nan
+                moments["max"][j] = row[n - 1] if n else np.nan
+            moments["n"][block] = n_valid
+            moments["n_missing"][block] = sorted_rows.shape[1] - n_valid
+
+        return cls(features, edges, proportions, knots, knot_cdf, n_knots, moments)
+
+    def save(self, path: str | Path) -> Path:
+        """Write the profile as a compressed ``.npz`` (no pickled objects)."""
+        path = Path(path)
+        width = max(int(self.n_knots.max(initial=0)), 1)  # drop unused knot padding
+        meta = {"format": PROFILE_FORMAT, "features": self.features}
+        with open(path, "wb") as f:
+            np.savez_compressed(
+                f,
+                meta=np.frombuffer(json.dumps(meta).encode(), dtype=np.uint8),
+                edges=self.edges,
+                proportions=self.proportions,
+                knots=self.knots[:, :width],
+                knot_cdf=self.knot_cdf[:, :width],
+                n_knots=self.n_knots,
+                **{f"moment_{name}": values for name, values in self.moments.items()},
+            )
+        return path
+
+    @classmethod
+    def load(cls, path: str | Path) -> ReferenceProfile:
+        with np.load(path, allow_pickle=False) as data:
+            meta = json.loads(data["meta"].tobytes())
+            if meta.get("format") != PROFILE_FORMAT:
+                raise ValueError(f"{path}: unsupported profile format {meta.get('format')}")
+            moments = {
+                key.removeprefix("moment_"): data[key]
+                for key in data.files
+                if key.startswith("moment_")
+            }
+            return cls(
+                meta["features"],
+                data["edges"],
+                data["proportions"],
+                data["knots"],
+                data["knot_cdf"],
+                data["n_knots"],
+                moments,
+            )
+
+    # ------------------------------------------------------------------
+    # Scoring
+    # ------------------------------------------------------------------
+    def select(self, features: list[str]) -> ReferenceProfile:
+        """Profile of a subset of the features, in the given order."""
+        missing = set(features) - set(self.features)
+        if missing:
+            raise KeyError(f"Features not in the reference profile: {sorted(missing)}")
+        idx = [self.features.index(f) for f in features]
+        return ReferenceProfile(
+            features,
+            self.edges[idx],
+            self.proportions[idx],
+            self.knots[idx],
+            self.knot_cdf[idx],
+            self.n_knots[idx],
+            {name: values[idx] for name, values in self.moments.items()},
+        )
+
+    def compare(
+        self,
+        current,
+        eps: float = 1e-4,
+        block_size: int = 64,
+        features: list[str] | None = None,
+    ) -> dict[str, np.ndarray]:
+        """Drift of ``current`` against this profile, keyed like :func:`drift_matrix`.
+
+        ``current`` is a DataFrame holding the profiled features, or an array
+        whose columns are in :attr:`features` order.  With ``features``, only
+        those are scored (and ``current`` needs only those columns).
+        """
+        if features is not None:
+            return self.select(features).compare(current, eps, block_size)
+        if isinstance(current, pd.DataFrame):
+            current = current[self.features]
+        values = feature_major(current)
+        if len(values) != len(self.features):
+            raise ValueError(f"Expected {len(self.features)} columns, got {len(values)}")
+
+        k = len(values)
+        psi = np.empty(k)
+        ks = np.empty(k)
+        cur_mean = np.empty(k)
+        n_cur = np.empty(k, dtype=np.int64)
+        for s in range(0, k, block_size):
+            block = slice(s, s + block_size)
+            sorted_rows, n_valid = sort_features(np.ascontiguousarray(values[block]))
+            counts = bin_counts(sorted_rows, n_valid, self.edges[block])
+            psi[block] = psi_from_counts(self.proportions[block], counts, eps)
+            for i, row in enumerate(sorted_rows):
+                j, n = s + i, n_valid[i]
+                ks[j] = ks_statistic_ecdf(
+                    self.knots[j, : self.n_knots[j]],
+                    self.knot_cdf[j, : self.n_knots[j]],
+                    int(self.moments["n"][j]),
+                    row[:n],
+                )
+                cur_mean[j] = row[:n].mean() if n else np.nan
+            n_cur[block] = n_valid
+
+        n_ref = self.moments["n"]
+        empty = (n_ref == 0) | (n_cur == 0)
+        return {
+            "psi": np.where(empty, np.nan, psi),
+            "ks_statistic": ks,
+            "ks_p_value": ks_pvalues(ks, n_ref, n_cur),
+            "ref_mean": self.moments["mean"],
+            "cur_mean": cur_mean,
+            "n_ref": n_ref,
+            "n_cur": n_cur,
+        }
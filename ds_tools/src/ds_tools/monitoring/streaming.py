@@ -0,0 +1,208 @@
+"""Streaming drift accumulation over out-of-core current windows.
+
+:func:`drift_report` needs the whole current window as one DataFrame.  A
+:class:`DriftAccumulator` instead takes the window chunk by chunk — arrays,
+DataFrames, CSV chunks or Parquet record batches — and keeps, per feature,
+only fixed-size state:
+
+- counts per PSI bin of the reference :class:`ReferenceProfile`;
+- a CDF sketch: how many values fall strictly below, and at or below, each
+  of the profile's ECDF knots;
+- count, missing count, mean, M2 (Chan et al.'s parallel update), min, max.
+
+Every piece is a sum or an order-free combination, so accumulators fed
+different slices of a window (in other processes, say) :meth:`merge` into
+exactly the state one accumulator would reach on the whole window.
+
+The KS statistic is read from the sketch.  The reference CDF is constant
+between its knots, so the largest gap on each interval is at one of its
+ends: at the knot itself, or just before the next knot (the "strictly
+below" count).  With a profile that kept every distinct reference value the
+result is exact, and :meth:`DriftAccumulator.finalize` returns the same
+report as ``drift_report(reference_df, current_df, ...)`` (p-values aside,
+which are asymptotic here).
+"""
+
+from __future__ import annotations
+
+import math
+from collections.abc import Iterable
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .engine import (
+    bin_counts,
+    feature_major,
+    ks_pvalues,
+    psi_from_counts,
+    searchsorted_rows,
+    sort_features,
+)
+from .profile import ReferenceProfile
+
+
+class DriftAccumulator:
+    """Fixed-memory drift state for a current window, updated chunk by chunk.
+
+    Parameters
+    ----------
+    reference : ReferenceProfile, or a DataFrame / array to fit one from
+    features : list[str] — features to track (default: all of the profile's)
+    n_bins, max_knots : forwarded to :meth:`ReferenceProfile.fit` when
+        ``reference`` is raw data; ``max_knots`` bounds the sketch size
+
+    Usage
+    -----
+    >>> acc = DriftAccumulator(ReferenceProfile.load("profile.npz"))
+    >>> for chunk in pd.read_csv("scores.csv", chunksize=1_000_000):
+    ...     acc.update(chunk)
+    >>> acc.finalize()  # same columns as drift_report
+    """
+
+    def __init__(
+        self,
+        reference,
+        features: list[str] | None = None,
+        n_bins: int = 10,
+        max_knots: int = 2048,
+    ):
+        if not isinstance(reference, ReferenceProfile):
+            reference = ReferenceProfile.fit(
+                reference, features, n_bins=n_bins, max_knots=max_knots
+            )
+        self.profile = reference
+        self.features = list(features) if features is not None else list(reference.features)
+        self._idx = np.array([reference.features.index(f) for f in self.features], dtype=np.int64)
+
+        k = len(self.features)
+        self.edges = reference.edges[self._idx]
+        self.knots = reference.knots[self._idx]
+        self.n_knots = reference.n_knots[self._idx]
+        self.bin_counts = np.zeros((k, reference.n_bins), dtype=np.int64)
+        self.below = np.zeros(self.knots.shape, dtype=np.int64)  # values < knot
+        self.at_or_below = np.zeros(self.knots.shape, dtype=np.int64)  # values <= knot
+        self.n = np.zeros(k, dtype=np.int64)
+        self.n_missing = np.zeros(k, dtype=np.int64)
+        self.mean = np.zeros(k)
+        self.m2 = np.zeros(k)
+        self.min = np.full(k, np.inf)
+        self.max = np.full(k, -np.inf)
+
+    # ------------------------------------------------------------------
+    # Accumulation
+    # ------------------------------------------------------------------
+    def update(self, chunk) -> DriftAccumulator:
+        """Add a chunk: DataFrame with the tracked features, or array in feature order."""
+        if isinstance(chunk, pd.DataFrame):
+            chunk = chunk[self.features]
+        values = feature_major(chunk)
+        if len(values) != len(self.features):
+            raise ValueError(f"Expected {len(self.features)} columns, got {len(values)}")
+        if values.shape[1] == 0:
+            return self
+
+        sorted_rows, n_valid = sort_features(np.ascontiguousarray(values))
+        self.bin_counts += bin_counts(sorted_rows, n_valid, self.edges)
+        self.below += searchsorted_rows(sorted_rows, n_valid, self.knots, side="left")
+        self.at_or_below += searchsorted_rows(sorted_rows, n_valid, self.knots, side="right")
+
+        rows = np.arange(len(sorted_rows))
+        has = n_valid > 0
+        with np.errstate(invalid="ignore", divide="ignore"):
+            chunk_mean = np.nansum(sorted_rows, axis=1) / n_valid
+            chunk_m2 = np.nansum((sorted_rows - chunk_mean[:, None]) ** 2, axis=1)
+        self._combine_moments(n_valid, np.where(has, chunk_mean, 0.0), np.where(has, chunk_m2, 0.0))
+        self.min = np.where(has, np.minimum(self.min, sorted_rows[:, 0]), self.min)
+        last = sorted_rows[rows, np.maximum(n_valid - 1, 0)]
+        self.max = np.where(has, np.maximum(self.max, last), self.max)
+        self.n_missing += values.shape[1] - n_valid
+        return self
+
+    def _combine_moments(self, n_b: np.ndarray, mean_b: np.ndarray, m2_b: np.ndarray) -> None:
+        n_a = self.n
+        total = n_a + n_b
+        with np.errstate(invalid="ignore", divide="ignore"):
+            delta = mean_b - self.mean
+            self.mean = np.where(total > 0, self.mean + delta * (n_b / total), 0.0)
+            self.m2 = np.where(total > 0, self.m2 + m2_b + delta**2 * (n_a * n_b / total), 0.0)
+        self.n = total
+
+    def update_many(self, chunks: Iterable) -> DriftAccumulator:
+        for chunk in chunks:
+            self.update(chunk)
+        return self
+
+    def update_csv(self, path: str | Path, chunksize: int = 1_000_000, **read_csv_kwargs):
+        """Stream a CSV file through :meth:`update`, ``chunksize`` rows at a time."""
+        reader = pd.read_csv(path, usecols=self.features, chunksize=chunksize, **read_csv_kwargs)
+        with reader:
+            return self.update_many(reader)
+
+    def update_parquet(self, path: str | Path, batch_size: int = 1_000_000):
+        """Stream a Parquet file's record batches through :meth:`update` (needs pyarrow)."""
+        import pyarrow.parquet as pq
+
+        parquet = pq.ParquetFile(path)
+        for batch in parquet.iter_batches(batch_size=batch_size, columns=self.features):
+            self.update(batch.to_pandas())
+        return self
+
+    def merge(self, other: DriftAccumulator) -> DriftAccumulator:
+        """Fold in another accumulator over the same profile and features."""
+        same_bins = np.array_equal(other.edges, self.edges, equal_nan=True)
+        if other.features != self.features or not same_bins:
+            raise ValueError("Can only merge accumulators built from the same profile and features")
+        self.bin_counts += other.bin_counts
+        self.below += other.below
+        self.at_or_below += other.at_or_below
+        self._combine_moments(other.n, other.mean, other.m2)
+        self.min = np.minimum(self.min, other.min)
+        self.max = np.maximum(self.max, other.max)
+        self.n_missing += other.n_missing
+        return self
+
+    # ------------------------------------------------------------------
+    # Results
+    # ------------------------------------------------------------------
+    def ks_statistic(self) -> np.ndarray:
+        """KS statistic per feature from the CDF sketch."""
+        ks = np.full(len(self.features), np.nan)
+        n_ref = self.profile.moments["n"][self._idx]
+        for j in np.flatnonzero((self.n > 0) & (n_ref > 0)):
+            k = self.n_knots[j]
+            ref_cdf = self.profile.knot_cdf[self._idx[j], :k]
+            before = np.concatenate([[0.0], ref_cdf[:-1]])  # reference CDF just below each knot
+            gaps = np.concatenate(
+                [
+                    ref_cdf - self.at_or_below[j, :k] / self.n[j],
+                    before - self.below[j, :k] / self.n[j],
+                ]
+            )
+            d = np.abs(gaps).max()
+            lcm = int(n_ref[j]) // math.gcd(int(n_ref[j]), int(self.n[j])) * int(self.n[j])
+            ks[j] = round(d * lcm) / lcm
+        return ks
+
+    def stats(self, eps: float = 1e-4) -> dict[str, np.ndarray]:
+        """Per-feature metrics, keyed like :func:`drift_matrix`."""
+        n_ref = self.profile.moments["n"][self._idx]
+        ks = self.ks_statistic()
+        empty = (n_ref == 0) | (self.n == 0)
+        psi = psi_from_counts(self.profile.proportions[self._idx], self.bin_counts, eps)
+        return {
+            "psi": np.where(empty, np.nan, psi),
+            "ks_statistic": ks,
+            "ks_p_value": ks_pvalues(ks, n_ref, self.n),
+            "ref_mean": self.profile.moments["mean"][self._idx],
+            "cur_mean": np.where(self.n > 0, self.mean, np.nan),
+            "n_ref": n_ref,
+            "n_cur": self.n.copy(),
+        }
+
+    def finalize(self) -> pd.DataFrame:
+        """The window's drift report, in :func:`drift_report`'s format."""
+        from .drift import _report_frame
+
+        return _report_frame(self.features, self.stats())
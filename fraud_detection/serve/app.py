@@ -18,56 +18,311 @@ Request:
             ...
         }
     }
+
+    Positional alternatives (order = feature_cols, see GET /health;
+    null / NaN → training median):
+    {"values": [150.0, 5.017, 12345, ...]}
+    {"values_b64": "<base64 of little-endian float32 buffer>"}
+
+    POST /predict/batch
+    {"features": [{...}, {...}, ...]}          # row-oriented
+    {"columns": {"TransactionAmt": [...], ...}} # column-oriented
+
+Micro-batching (optional):
+    FRAUD_MICROBATCH=1               coalesce concurrent /predict calls
+    FRAUD_MICROBATCH_MAX_SIZE=64     flush at this many queued rows
+    FRAUD_MICROBATCH_MAX_WAIT_MS=2   ... or after this long, whichever first
+
+Inference backend (optional):
+    FRAUD_INFERENCE_BACKEND=compiled  score small batches with the flat-array
+                                      tree engine (see serve/tree_engine.py)
+    FRAUD_COMPILED_MAX_ROWS=32        larger batches still go to LightGBM
+
+Observability:
+    GET /metrics                  Prometheus text format — request counters and
+                                  per-stage latency histograms (parse, impute,
+                                  inference, serialize)
+    FRAUD_LOG_SAMPLE_RATE=0.01    fraction of requests that emit a log line;
+                                  log records are written by a background
+                                  listener thread, off the request path
+
+Model hot-swap (optional):
+    FRAUD_REGISTRY_DIR=../ml_platform/demo/results/model_registry
+                                  serve the newest v<N>/ and poll for newer
+                                  ones; each is loaded and warmed in the
+                                  background, then swapped in atomically
+    FRAUD_REGISTRY_POLL_S=5       poll interval
+
+Shadow scoring (optional, needs FRAUD_REGISTRY_DIR):
+    FRAUD_SHADOW_VERSION=3        also score traffic with registry v3 in the
+                                  background; GET /shadow/stats compares it
+    FRAUD_SHADOW_FRACTION=0.1     share of rows sent to the challenger
+    FRAUD_SHADOW_WORKERS=1        background worker threads
+
+Result cache (optional — absorbs upstream retries / duplicate webhooks):
+    FRAUD_CACHE_SIZE=100000       cache /predict scores for this many distinct
+                                  feature vectors (LRU eviction; 0 = off)
+    FRAUD_CACHE_TTL_S=300         entry lifetime; the cache is also cleared
+                                  whenever a new model is swapped in
 """
 
 from __future__ import annotations
 
+import atexit
+import base64
+import binascii
 import logging
 import os
+import queue
+import random
 import time
+from logging.handlers import QueueHandler, QueueListener
+from pathlib import Path
 
-import joblib
 import numpy as np
-import pandas as pd
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse
 from pydantic import BaseModel
 
+from .metrics import MetricsRegistry
+from .micro_batcher import MicroBatcher
+from .model_registry import ModelBundle, RegistryWatcher, latest_version
+from .result_cache import ResultCache
+from .shadow import ShadowScorer
+
 # ── Logging ──────────────────────────────────────────────────────────
 logging.basicConfig(level=logging.INFO, format="%(asctime)s  %(message)s")
 logger = logging.getLogger(__name__)
+LOG_SAMPLE_RATE = float(os.environ.get("FRAUD_LOG_SAMPLE_RATE", "0.01"))
 
-# ── Load artefacts ───────────────────────────────────────────────────
-ARTEFACT_PATH = os.path.join(
-    os.path.dirname(__file__), "..", "demo", "results", "fraud_model.joblib"
+# Hand records to a listener thread so formatting + stream I/O stay off the hot path
+# (the listener is started by start_background below)
+_log_handler = next((h for h in logger.handlers if isinstance(h, QueueHandler)), None)
+if _log_handler is None:
+    _log_handler = QueueHandler(queue.SimpleQueue())
+    _log_handler.listener = None
+    logger.addHandler(_log_handler)
+    logger.propagate = False
+_LOG_TARGETS = logging.getLogger().handlers or [logging.StreamHandler()]
+
+# ── Load model ───────────────────────────────────────────────────────
+T_START = time.perf_counter()
+ARTEFACT_PATH = os.environ.get(
+    "FRAUD_ARTEFACT_PATH",
+    os.path.join(os.path.dirname(__file__), "..", "demo", "results", "fraud_model.joblib"),
 )
-artefacts = joblib.load(ARTEFACT_PATH)
+REGISTRY_DIR = os.environ.get("FRAUD_REGISTRY_DIR")
+MAX_BATCH_ROWS = int(os.environ.get("FRAUD_MAX_BATCH_ROWS", "10000"))
+BUNDLE_KWARGS = {
+    "compiled": os.environ.get("FRAUD_INFERENCE_BACKEND", "lightgbm") == "compiled",
+    "compiled_max_rows": int(os.environ.get("FRAUD_COMPILED_MAX_ROWS", "32")),
+}
+
+
+def _initial_bundle() -> ModelBundle:
+    version = latest_version(REGISTRY_DIR) if REGISTRY_DIR else None
+    if version is not None:
+        return ModelBundle.load_version(Path(REGISTRY_DIR) / f"v{version}", **BUNDLE_KWARGS)
+    return ModelBundle.load(ARTEFACT_PATH, **BUNDLE_KWARGS)
 
-MODEL = artefacts["model"]
-FEATURE_COLS = artefacts["feature_cols"]
-THRESHOLD = artefacts["threshold"]
-MODEL_NAME = artefacts["model_name"]
-TRAIN_MEDIANS = pd.Series(artefacts["train_medians"])
-NUMERIC_COLS = artefacts["numeric_cols"]
+
+# The active bundle is replaced wholesale on hot-swap.  Handlers read it once
+# per request, so in-flight requests finish on the model they started with.
+BUNDLE = _initial_bundle()
+BUNDLE.warm_up()
+STARTUP_MS = (time.perf_counter() - T_START) * 1000
 
 logger.info(
-    "Loaded %s  |  threshold=%.4f  |  %d features",
-    MODEL_NAME,
-    THRESHOLD,
-    len(FEATURE_COLS),
+    "Loaded %s (v%s)  |  threshold=%.4f  |  %d features  |  startup=%.0fms",
+    BUNDLE.model_name,
+    BUNDLE.version,
+    BUNDLE.threshold,
+    len(BUNDLE.feature_cols),
+    STARTUP_MS,
+)
+
+BATCHER = (
+    MicroBatcher(
+        max_batch_size=int(os.environ.get("FRAUD_MICROBATCH_MAX_SIZE", "64")),
+        max_wait_ms=float(os.environ.get("FRAUD_MICROBATCH_MAX_WAIT_MS", "2")),
+    )
+    if os.environ.get("FRAUD_MICROBATCH", "0") == "1"
+    else None
+)
+
+CACHE = (
+    ResultCache(
+        maxsize=int(os.environ["FRAUD_CACHE_SIZE"]),
+        ttl_s=float(os.environ.get("FRAUD_CACHE_TTL_S", "300")),
+    )
+    if int(os.environ.get("FRAUD_CACHE_SIZE", "0")) > 0
+    else None
+)
+
+# ── Metrics ──────────────────────────────────────────────────────────
+METRICS = MetricsRegistry()
+STAGES = ("parse", "impute", "inference", "serialize")
+ENDPOINTS = ("/predict", "/predict/batch")
+STAGE_LATENCY = {
+    (ep, stage): METRICS.histogram(
+        "fraud_stage_latency_ms",
+        help="Latency of each request-handling stage (ms)",
+        labels={"endpoint": ep, "stage": stage},
+    )
+    for ep in ENDPOINTS
+    for stage in STAGES
+}
+REQUEST_LATENCY = {
+    ep: METRICS.histogram(
+        "fraud_request_latency_ms",
+        help="End-to-end handler latency (ms)",
+        labels={"endpoint": ep},
+    )
+    for ep in ENDPOINTS
+}
+REQUESTS = {
+    ep: METRICS.counter("fraud_requests_total", "Scoring requests served", {"endpoint": ep})
+    for ep in ENDPOINTS
+}
+ROWS_SCORED = METRICS.counter("fraud_rows_scored_total", "Transactions scored")
+ROWS_FLAGGED = METRICS.counter("fraud_rows_flagged_total", "Transactions flagged as fraud")
+if BATCHER is not None:
+    METRICS.register(BATCHER.batch_size_hist)
+    METRICS.register(BATCHER.queue_wait_hist)
+if CACHE is not None:
+    for _counter in (CACHE.hits, CACHE.misses, CACHE.evictions):
+        METRICS.register(_counter)
+MODEL_VERSION = METRICS.gauge("fraud_model_version", "Registry version being served (-1: artefact)")
+MODEL_VERSION.set(BUNDLE.version if BUNDLE.version is not None else -1)
+METRICS.gauge("fraud_startup_ms", "Process start → first model ready (ms)").set(STARTUP_MS)
+MODEL_LOAD_MS = METRICS.gauge("fraud_model_load_ms", "Load time of the active model (ms)")
+MODEL_LOAD_MS.set(BUNDLE.load_ms)
+MODEL_SWAPS = METRICS.counter("fraud_model_swaps_total", "Hot-swaps from the model registry")
+MODEL_SWAP_MS = METRICS.histogram(
+    "fraud_model_swap_ms",
+    (10.0, 50.0, 100.0, 250.0, 500.0, 1000.0, 2500.0, 5000.0, 10000.0),
+    help="Load + warm-up time of hot-swapped model versions (ms)",
 )
 
+
+# ── Hot-swap ─────────────────────────────────────────────────────────
+
+
+def _swap_bundle(bundle: ModelBundle) -> None:
+    global BUNDLE
+    if SHARED_DIR is not None:
+        bundle = bundle.with_shared_arrays(_shared_dir(bundle))  # workers map one copy
+    BUNDLE = bundle  # single reference assignment — atomic for readers
+    if CACHE is not None:
+        CACHE.clear()  # keys carry the version too, so late writes from old requests never hit
+    MODEL_VERSION.set(bundle.version if bundle.version is not None else -1)
+    MODEL_LOAD_MS.set(bundle.load_ms)
+    MODEL_SWAP_MS.observe(bundle.load_ms + bundle.warm_ms)
+    MODEL_SWAPS.inc()
+
+
+# ── Shadow scoring ───────────────────────────────────────────────────
+SHADOW: ShadowScorer | None = None
+if os.environ.get("FRAUD_SHADOW_VERSION"):
+    if not REGISTRY_DIR:
+        raise RuntimeError("FRAUD_SHADOW_VERSION requires FRAUD_REGISTRY_DIR")
+    _challenger = ModelBundle.load_version(
+        Path(REGISTRY_DIR) / f"v{int(os.environ['FRAUD_SHADOW_VERSION'])}", **BUNDLE_KWARGS
+    )
+    _challenger.warm_up()
+    SHADOW = ShadowScorer(
+        _challenger,
+        fraction=float(os.environ.get("FRAUD_SHADOW_FRACTION", "0.1")),
+        max_workers=int(os.environ.get("FRAUD_SHADOW_WORKERS", "1")),
+    )
+    atexit.register(SHADOW.shutdown)
+    logger.info("Shadow scoring %s (v%s)", _challenger.model_name, _challenger.version)
+
+
+# ── Background threads and pre-fork sharing ──────────────────────────
+# Threads do not survive fork(): the pre-fork launcher (serve/launcher.py)
+# stops them in the parent and starts fresh ones in every worker.
+WATCHER: RegistryWatcher | None = None
+SHARED_DIR: Path | None = None
+
+
+def start_background() -> None:
+    """Start this process's log listener and registry watcher (no-op if running)."""
+    global WATCHER
+    if _log_handler.listener is None:
+        _log_handler.listener = QueueListener(_log_handler.queue, *_LOG_TARGETS)
+        _log_handler.listener.start()
+    if REGISTRY_DIR and WATCHER is None:
+        WATCHER = RegistryWatcher(
+            REGISTRY_DIR,
+            on_swap=_swap_bundle,
+            current_version=BUNDLE.version,
+            poll_interval_s=float(os.environ.get("FRAUD_REGISTRY_POLL_S", "5")),
+            **BUNDLE_KWARGS,
+        ).start()
+
+
+def stop_background() -> None:
+    """Stop the registry watcher and the log listener, flushing queued records."""
+    global WATCHER
+    if WATCHER is not None:
+        WATCHER.stop()
+        WATCHER = None
+    if _log_handler.listener is not None:
+        _log_handler.listener.stop()
+        _log_handler.listener = None
+
+
+def _shared_dir(bundle: ModelBundle) -> Path:
+    return SHARED_DIR / (f"v{bundle.version}" if bundle.version is not None else "artefact")
+
+
+def share_arrays(directory: str | Path) -> None:
+    """Memory-map the served bundles' arrays under ``directory`` (pre-fork launcher).
+
+    Bundles hot-swapped in afterwards are shared there too, so workers that
+    load the same version map one copy instead of each holding its own.
+    """
+    global BUNDLE, SHARED_DIR
+    SHARED_DIR = Path(directory)
+    BUNDLE = BUNDLE.with_shared_arrays(_shared_dir(BUNDLE))
+    if SHADOW is not None:
+        SHADOW.challenger = SHADOW.challenger.with_shared_arrays(_shared_dir(SHADOW.challenger))
+
+
+start_background()
+atexit.register(stop_background)
+
+
+def _record(endpoint: str, marks: list[float], n_rows: int, n_flagged: int) -> None:
+    """Record stage latencies from consecutive ``perf_counter`` marks."""
+    for stage, start, end in zip(STAGES, marks, marks[1:]):
+        STAGE_LATENCY[endpoint, stage].observe((end - start) * 1000)
+    REQUEST_LATENCY[endpoint].observe((marks[-1] - marks[0]) * 1000)
+    REQUESTS[endpoint].inc()
+    ROWS_SCORED.inc(n_rows)
+    ROWS_FLAGGED.inc(n_flagged)
+
+
 # ── FastAPI app ──────────────────────────────────────────────────────
 app = FastAPI(title="Fraud Detection API", version="0.2.0")
 
 
 class PredictionRequest(BaseModel):
-    """Input: pre-computed feature vector as a dict.
+    """Input: pre-computed feature vector.
 
     In a real setup, an upstream feature pipeline (Spark, Airflow)
-    builds this dict from the raw transaction + identity data.
+    builds this vector from the raw transaction + identity data.
+    Exactly one layout must be provided:
+    - ``features`` — dict of feature name → value
+    - ``values`` — list ordered like the model's feature_cols
+    - ``values_b64`` — base64-encoded little-endian float32 buffer
     """
 
-    features: dict
+    features: dict | None = None
+    values: list[float | None] | None = None
+    values_b64: str | None = None
 
 
 class Prediction(BaseModel):
@@ -78,40 +333,214 @@ class Prediction(BaseModel):
     latency_ms: float
 
 
+class BatchPredictionRequest(BaseModel):
+    """Input: a micro-batch of feature vectors.
+
+    Exactly one of the two layouts must be provided:
+    - ``features`` — list of feature dicts (one per transaction)
+    - ``columns`` — dict of column name → list of values (columnar)
+    """
+
+    features: list[dict] | None = None
+    columns: dict[str, list] | None = None
+
+
+class BatchItem(BaseModel):
+    is_fraud: bool
+    probability: float
+
+
+class BatchPrediction(BaseModel):
+    predictions: list[BatchItem]
+    n_rows: int
+    threshold: float
+    model: str
+    latency_ms: float
+
+
+def _impute(bundle: ModelBundle, x: np.ndarray) -> np.ndarray:
+    """Replace NaN (missing) entries with training medians in one vectorised pass."""
+    return np.where(np.isnan(x), bundle.median_vector, x)
+
+
+def _parse_batch(bundle: ModelBundle, req: BatchPredictionRequest) -> np.ndarray:
+    """Assemble an (n_rows, n_features) float32 matrix; missing entries are NaN."""
+    if (req.features is None) == (req.columns is None):
+        raise HTTPException(422, "Provide exactly one of 'features' or 'columns'")
+
+    if req.features is not None:
+        n_rows = len(req.features)
+    else:
+        lengths = {len(v) for v in req.columns.values()}
+        if len(lengths) > 1:
+            raise HTTPException(422, "All columns must have the same length")
+        n_rows = lengths.pop() if lengths else 0
+    # Checked before anything is allocated for the rows
+    if n_rows > MAX_BATCH_ROWS:
+        raise HTTPException(413, f"Batch of {n_rows} rows exceeds limit of {MAX_BATCH_ROWS}")
+
+    if req.features is not None:
+        # None → NaN when cast to float
+        x = np.array(
+            [[row.get(col) for col in bundle.feature_cols] for row in req.features],
+            dtype=np.float32,
+        ).reshape(n_rows, len(bundle.feature_cols))
+    else:
+        x = np.full((n_rows, len(bundle.feature_cols)), np.nan, dtype=np.float32)
+        for j, col in enumerate(bundle.feature_cols):
+            values = req.columns.get(col)
+            if values is not None:
+                x[:, j] = np.array(values, dtype=np.float32)
+
+    return x
+
+
+def _parse_row(bundle: ModelBundle, req: PredictionRequest) -> np.ndarray:
+    """Assemble one float32 feature row with a single allocation; missing entries are NaN."""
+    provided = [v is not None for v in (req.features, req.values, req.values_b64)]
+    if sum(provided) != 1:
+        raise HTTPException(422, "Provide exactly one of 'features', 'values' or 'values_b64'")
+
+    if req.features is not None:
+        # Touch only the features the caller sent — no walk over feature_cols
+        x = np.full(bundle.median_vector.shape, np.nan, dtype=np.float32)
+        for col, val in req.features.items():
+            idx = bundle.feature_index.get(col)
+            if idx is not None and val is not None:
+                x[idx] = val
+        return x
+
+    if req.values is not None:
+        x = np.array(req.values, dtype=np.float32)
+    else:
+        try:
+            x = np.frombuffer(base64.b64decode(req.values_b64, validate=True), dtype="<f4")
+        except (binascii.Error, ValueError) as exc:
+            raise HTTPException(422, f"Invalid values_b64 payload: {exc}") from exc
+    if x.shape != bundle.median_vector.shape:
+        raise HTTPException(422, f"Expected {len(bundle.feature_cols)} values, got {x.size}")
+    return x
+
+
 @app.post("/predict", response_model=Prediction)
-def predict(req: PredictionRequest) -> Prediction:
-    t0 = time.perf_counter()
-
-    # Optimized inference: construct numpy array directly (avoiding pandas overhead)
-    x_input = []
-    for col in FEATURE_COLS:
-        val = req.features.get(col)
-        # Impute missing values with training medians if available
-        if val is None:
-            val = TRAIN_MEDIANS.get(col, np.nan)
-        x_input.append(val)
-
-    x = np.array(x_input).reshape(1, -1)
-    prob = float(MODEL.predict_proba(x)[:, 1][0])
-    is_fraud = prob >= THRESHOLD
-
-    latency = (time.perf_counter() - t0) * 1000
-    logger.info(
-        "prob=%.4f  fraud=%s  latency=%.1fms",
-        prob,
-        is_fraud,
-        latency,
-    )
+async def predict(req: PredictionRequest) -> Response:
+    marks = [time.perf_counter()]
+    bundle = BUNDLE
 
-    return Prediction(
+    x = _parse_row(bundle, req)
+    marks.append(time.perf_counter())
+    x = _impute(bundle, x)
+    marks.append(time.perf_counter())
+    key = prob = None
+    if CACHE is not None:
+        key = CACHE.key(bundle.version, x)
+        prob = CACHE.get(key)
+    if prob is None:
+        if BATCHER is not None:
+            prob = await BATCHER.submit(x, bundle.score)
+        else:
+            prob = float((await run_in_threadpool(bundle.score, x.reshape(1, -1)))[0])
+        if key is not None:
+            CACHE.put(key, prob)
+    is_fraud = prob >= bundle.threshold
+    marks.append(time.perf_counter())
+
+    latency = (marks[-1] - marks[0]) * 1000
+    body = Prediction(
         is_fraud=is_fraud,
         probability=round(prob, 6),
-        threshold=THRESHOLD,
-        model=MODEL_NAME,
+        threshold=bundle.threshold,
+        model=bundle.model_name,
         latency_ms=round(latency, 2),
-    )
+    ).model_dump_json()
+    marks.append(time.perf_counter())
+
+    if SHADOW is not None:
+        SHADOW.submit(bundle, x.reshape(1, -1), np.array([prob]))
+    _record("/predict", marks, 1, int(is_fraud))
+    if random.random() < LOG_SAMPLE_RATE:
+        logger.info("prob=%.4f  fraud=%s  latency=%.1fms", prob, is_fraud, latency)
+
+    return Response(content=body, media_type="application/json")
+
+
+@app.post("/predict/batch", response_model=BatchPrediction)
+def predict_batch(req: BatchPredictionRequest) -> Response:
+    marks = [time.perf_counter()]
+    bundle = BUNDLE
+
+    x = _parse_batch(bundle, req)
+    marks.append(time.perf_counter())
+    x = _impute(bundle, x)
+    marks.append(time.perf_counter())
+    # One predict_proba call per batch amortises LightGBM's per-call overhead
+    probs = bundle.score(x) if len(x) else np.empty(0)
+    flags = probs >= bundle.threshold
+    marks.append(time.perf_counter())
+
+    latency = (marks[-1] - marks[0]) * 1000
+    body = BatchPrediction(
+        predictions=[
+            BatchItem(is_fraud=bool(f), probability=round(float(p), 6))
+            for p, f in zip(probs, flags)
+        ],
+        n_rows=len(x),
+        threshold=bundle.threshold,
+        model=bundle.model_name,
+        latency_ms=round(latency, 2),
+    ).model_dump_json()
+    marks.append(time.perf_counter())
+
+    if SHADOW is not None and len(x):
+        SHADOW.submit(bundle, x, probs)
+    n_flagged = int(flags.sum())
+    _record("/predict/batch", marks, len(x), n_flagged)
+    if random.random() < LOG_SAMPLE_RATE:
+        logger.info("batch rows=%d  flagged=%d  latency=%.1fms", len(x), n_flagged, latency)
+
+    return Response(content=body, media_type="application/json")
 
 
 @app.get("/health")
 def health():
-    return {"status": "ok", "model": MODEL_NAME, "features": len(FEATURE_COLS)}
+    bundle = BUNDLE
+    return {
+        "status": "ok",
+        "model": bundle.model_name,
+        "version": bundle.version,
+        "features": len(bundle.feature_cols),
+        "feature_cols": bundle.feature_cols,
+        "startup_ms": round(STARTUP_MS, 2),
+        "load_ms": round(bundle.load_ms, 2),
+        "warm_ms": round(bundle.warm_ms, 2),
+        "last_swap": WATCHER.last_swap if WATCHER is not None else None,
+    }
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics() -> PlainTextResponse:
+    return PlainTextResponse(METRICS.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/shadow/stats")
+def shadow_stats():
+    """Rolling champion-vs-challenger comparison from shadow scoring."""
+    if SHADOW is None:
+        return {"enabled": False}
+    return {"enabled": True, "champion_version": BUNDLE.version, **SHADOW.stats()}
+
+
+@app.get("/stats/batching")
+def batching_stats():
+    """Batch-size and queue-wait histograms of the micro-batcher."""
+    if BATCHER is None:
+        return {"enabled": False}
+    return {"enabled": True, **BATCHER.stats()}
+
+
+@app.get("/stats/cache")
+def cache_stats():
+    """Hit / miss / eviction counts of the /predict result cache."""
+    if CACHE is None:
+        return {"enabled": False}
+    return {"enabled": True, **CACHE.stats()}
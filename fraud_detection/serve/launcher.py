@@ -0,0 +1,222 @@
+"""Pre-fork launcher: load the model once, then fork N uvicorn workers.
+
+``uvicorn --workers N`` spawns fresh interpreters, so every worker unpickles
+its own copy of the artefact and pays the cold start again.  This launcher
+imports ``serve.app`` once in the parent (model load, compilation, warm-up),
+moves the large NumPy tables into memory-mapped files, stops the app's
+background threads, freezes the GC so collections in the children do not
+dirty the shared object pages, binds the listening socket and only then
+forks.  Workers inherit the loaded model copy-on-write, share one accept
+socket and each start their own log listener and registry watcher.
+
+Run (from ``fraud_detection/``):
+    python -m serve.launcher --workers 4 --port 8000
+
+Memory / startup report for several worker counts (JSON to stdout):
+    python -m serve.launcher --report 1 2 4 8 16
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import importlib
+import json
+import os
+import signal
+import socket
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+
+def _memory_kb(pid: int) -> dict:
+    """Rss / Pss / shared / private memory (kB) from ``/proc/<pid>/smaps_rollup``."""
+    fields = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) == 3 and parts[2] == "kB":
+                    fields[parts[0].rstrip(":")] = int(parts[1])
+    except OSError:  # non-Linux or process already gone
+        return {}
+    return {
+        "rss_kb": fields.get("Rss", 0),
+        "pss_kb": fields.get("Pss", 0),
+        "shared_kb": fields.get("Shared_Clean", 0) + fields.get("Shared_Dirty", 0),
+        "private_kb": fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0),
+    }
+
+
+def preload(mmap_dir: str | Path | None = None):
+    """Import the app in this process and share its arrays via memory-mapped files.
+
+    The app's background threads (log listener, registry watcher) are
+    stopped: threads do not survive ``fork()``, and each worker starts its
+    own.  Each launch maps its tables from a fresh directory under
+    ``mmap_dir``, so files from an earlier run are never picked up.
+    """
+    t0 = time.perf_counter()
+    module = importlib.import_module("serve.app")
+    module.stop_background()
+    if mmap_dir is not None:
+        Path(mmap_dir).mkdir(parents=True, exist_ok=True)
+    module.share_arrays(tempfile.mkdtemp(prefix="fraud-serve-", dir=mmap_dir))
+    gc.collect()
+    gc.freeze()  # keep the GC from writing to (and un-sharing) inherited objects
+    return module, (time.perf_counter() - t0) * 1000
+
+
+def _bind(host: str, port: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _run_worker(module, sock: socket.socket, ready_fd: int, log_level: str) -> None:
+    import uvicorn
+
+    class _Server(uvicorn.Server):
+        async def startup(self, sockets=None):
+            await super().startup(sockets=sockets)
+            os.write(ready_fd, f"{os.getpid()}\n".encode())
+
+    config = uvicorn.Config(module.app, log_level=log_level, access_log=False)
+    _Server(config).run(sockets=[sock])
+
+
+def launch(
+    n_workers: int,
+    host: str = "127.0.0.1",
+    port: int = 8000,
+    mmap_dir: str | Path | None = None,
+    log_level: str = "warning",
+) -> dict:
+    """Preload, fork ``n_workers`` and block until every worker is accepting.
+
+    Returns timings and worker pids; the caller owns the workers' lifetime.
+    """
+    t0 = time.perf_counter()
+    module, preload_ms = preload(mmap_dir)
+    sock = _bind(host, port)
+    read_fd, write_fd = os.pipe()
+
+    pids = []
+    for _ in range(n_workers):
+        pid = os.fork()
+        if pid == 0:  # child
+            os.close(read_fd)
+            try:
+                module.start_background()
+                _run_worker(module, sock, write_fd, log_level)
+            finally:
+                os._exit(0)
+        pids.append(pid)
+    os.close(write_fd)
+
+    ready, buffer = set(), b""
+    with os.fdopen(read_fd, "rb") as pipe:
+        while len(ready) < n_workers:
+            chunk = pipe.read1(4096)
+            if not chunk:
+                raise RuntimeError(f"Only {len(ready)}/{n_workers} workers came up")
+            buffer += chunk
+            *lines, buffer = buffer.split(b"\n")
+            ready.update(int(line) for line in lines if line)
+
+    return {
+        "workers": n_workers,
+        "pids": pids,
+        "port": sock.getsockname()[1],
+        "preload_ms": round(preload_ms, 2),
+        "startup_ms": round((time.perf_counter() - t0) * 1000, 2),
+        "socket": sock,
+    }
+
+
+def _stop(pids: list[int]) -> None:
+    for pid in pids:
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+    for pid in pids:
+        try:
+            os.waitpid(pid, 0)
+        except ChildProcessError:
+            pass
+
+
+def _measure(n_workers: int) -> dict:
+    """Run one launch in a child process (fresh parent heap) and report memory."""
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read_fd)
+        info = launch(n_workers, port=0)
+        time.sleep(0.5)  # let workers settle after startup
+        per_worker = [_memory_kb(p) for p in info["pids"]]
+        report = {
+            "workers": n_workers,
+            "preload_ms": info["preload_ms"],
+            "startup_ms": info["startup_ms"],
+            "parent": _memory_kb(os.getpid()),
+            "worker_avg": {
+                k: round(sum(m.get(k, 0) for m in per_worker) / n_workers)
+                for k in ("rss_kb", "pss_kb", "shared_kb", "private_kb")
+            },
+        }
+        _stop(info["pids"])
+        os.write(write_fd, json.dumps(report).encode())
+        os._exit(0)
+    os.close(write_fd)
+    with os.fdopen(read_fd, "rb") as pipe:
+        payload = pipe.read()
+    os.waitpid(pid, 0)
+    return json.loads(payload)
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--mmap-dir", default=os.environ.get("FRAUD_MMAP_DIR"))
+    parser.add_argument("--log-level", default="warning")
+    parser.add_argument(
+        "--report",
+        type=int,
+        nargs="+",
+        metavar="N",
+        help="measure startup time and per-worker memory for each worker count, then exit",
+    )
+    args = parser.parse_args(argv)
+
+    if args.report:
+        print(json.dumps([_measure(n) for n in args.report], indent=2))
+        return
+
+    info = launch(args.workers, args.host, args.port, args.mmap_dir, args.log_level)
+    print(
+        f"{info['workers']} workers on {args.host}:{info['port']}  "
+        f"(preload {info['preload_ms']:.0f}ms, ready {info['startup_ms']:.0f}ms)",
+        file=sys.stderr,
+    )
+    signal.signal(signal.SIGTERM, lambda *_: _stop(info["pids"]) or sys.exit(0))
+    try:
+        while True:
+            pid, _ = os.wait()  # a worker died — let the supervisor (k8s, systemd) restart us
+            print(f"worker {pid} exited — shutting down", file=sys.stderr)
+            break
+    except KeyboardInterrupt:
+        pass
+    _stop(info["pids"])
+
+
+if __name__ == "__main__":
+    main()
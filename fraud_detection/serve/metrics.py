@@ -0,0 +1,170 @@
+"""In-process serving metrics with a Prometheus text exposition.
+
+Kept dependency-free on purpose: the serving container should not need a
+metrics client library just to expose a few counters and histograms.
+
+Updates are lock-free: every thread writes to its own shard (created once,
+on the thread's first update) and :meth:`MetricsRegistry.render` sums the
+shards at scrape time.  A scrape may therefore miss an update that is
+happening concurrently, but no update is ever lost.
+"""
+
+from __future__ import annotations
+
+import threading
+from bisect import bisect_left
+
+# Upper bounds (inclusive) — anything above the last bound lands in +Inf
+LATENCY_MS_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 25.0, 50.0, 100.0, 250.0)
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512)
+
+
+class _Sharded:
+    """Base for metrics whose hot path writes to a per-thread list."""
+
+    def __init__(self, name: str, help: str, labels: dict | None, width: int):
+        self.name = name
+        self.help = help
+        self.labels = labels or {}
+        self._width = width
+        self._local = threading.local()
+        self._shards: list[list] = []
+        self._shards_lock = threading.Lock()  # only taken when a new thread shows up
+
+    def _shard(self) -> list:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = [0] * self._width
+            with self._shards_lock:
+                self._shards.append(shard)
+        return shard
+
+    def _totals(self) -> list:
+        with self._shards_lock:
+            shards = list(self._shards)
+        return [sum(col) for col in zip(*shards)] if shards else [0] * self._width
+
+    def _label_str(self, extra: dict | None = None) -> str:
+        labels = {**self.labels, **(extra or {})}
+        if not labels:
+            return ""
+        return "{" + ",".join(f'{k}="{v}"' for k, v in labels.items()) + "}"
+
+
+class Counter(_Sharded):
+    """Monotonically increasing counter."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help: str = "", labels: dict | None = None):
+        super().__init__(name, help, labels, width=1)
+
+    def inc(self, amount: float = 1) -> None:
+        self._shard()[0] += amount
+
+    @property
+    def value(self) -> float:
+        return self._totals()[0]
+
+    def samples(self) -> list[str]:
+        return [f"{self.name}{self._label_str()} {self.value}"]
+
+
+class Gauge(_Sharded):
+    """Value that can go up and down (last write wins — no sharding needed)."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str = "", labels: dict | None = None):
+        super().__init__(name, help, labels, width=1)
+        self.value = 0.0
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+    def samples(self) -> list[str]:
+        return [f"{self.name}{self._label_str()} {self.value}"]
+
+
+class Histogram(_Sharded):
+    """Fixed-bucket histogram with Prometheus-style cumulative ``le`` buckets.
+
+    Shard layout: one slot per bucket (+Inf last), then sum, then count.
+    """
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        buckets: tuple[float, ...],
+        help: str = "",
+        labels: dict | None = None,
+    ):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, help, labels, width=len(self.buckets) + 3)
+
+    def observe(self, value: float) -> None:
+        shard = self._shard()
+        shard[bisect_left(self.buckets, value)] += 1
+        shard[-2] += value
+        shard[-1] += 1
+
+    def snapshot(self) -> dict:
+        totals = self._totals()
+        cumulative, buckets = 0, {}
+        for le, n in zip((*self.buckets, "+Inf"), totals[:-2]):
+            cumulative += n
+            buckets[str(le)] = cumulative
+        return {"buckets": buckets, "count": totals[-1], "sum": round(totals[-2], 6)}
+
+    def samples(self) -> list[str]:
+        snap = self.snapshot()
+        lines = [
+            f"{self.name}_bucket{self._label_str({'le': le})} {n}"
+            for le, n in snap["buckets"].items()
+        ]
+        lines.append(f"{self.name}_sum{self._label_str()} {snap['sum']}")
+        lines.append(f"{self.name}_count{self._label_str()} {snap['count']}")
+        return lines
+
+
+class MetricsRegistry:
+    """Collection of metrics rendered together on ``/metrics``.
+
+    Several metrics may share a name as long as their labels differ
+    (e.g. one latency histogram per pipeline stage).
+    """
+
+    def __init__(self):
+        self._metrics: list[_Sharded] = []
+
+    def register(self, metric: _Sharded) -> _Sharded:
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, help: str = "", labels: dict | None = None) -> Counter:
+        return self.register(Counter(name, help, labels))
+
+    def gauge(self, name: str, help: str = "", labels: dict | None = None) -> Gauge:
+        return self.register(Gauge(name, help, labels))
+
+    def histogram(
+        self,
+        name: str,
+        buckets: tuple[float, ...] = LATENCY_MS_BUCKETS,
+        help: str = "",
+        labels: dict | None = None,
+    ) -> Histogram:
+        return self.register(Histogram(name, buckets, help, labels))
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        lines, seen = [], set()
+        for metric in sorted(self._metrics, key=lambda m: m.name):
+            if metric.name not in seen:
+                seen.add(metric.name)
+                lines.append(f"# HELP {metric.name} {metric.help}")
+                lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,153 @@
+"""Adaptive micro-batching for single-row inference requests.
+
+Concurrent ``/predict`` calls are queued and coalesced into one matrix so
+the model pays its per-call overhead once per batch instead of once per
+request.  A batch is flushed when either limit is hit:
+
+- ``max_batch_size`` rows are waiting, or
+- ``max_wait_ms`` has elapsed since the oldest queued row arrived.
+
+Inference runs in the default thread pool, so while one batch is being
+scored the next one keeps filling up — under load batches grow on their
+own, and at low load a lone request waits at most ``max_wait_ms``.
+``max_wait_ms=0`` disables the wait entirely (flush whatever is queued).
+
+A row may carry its own ``predict_fn`` (e.g. the model bundle that was
+active when the request arrived); a flushed batch is split per function so
+rows queued before a model swap are still scored by the model they saw.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from collections.abc import Callable
+
+import numpy as np
+
+from .metrics import BATCH_SIZE_BUCKETS, LATENCY_MS_BUCKETS, Histogram
+
+
+class MicroBatcher:
+    """Coalesce single-row predictions into batched ``predict_fn`` calls.
+
+    Parameters
+    ----------
+    predict_fn : callable or None — default ``(n_rows, n_features) array → (n_rows,)
+        scores``; may be omitted if every :meth:`submit` passes its own
+    max_batch_size : int — flush as soon as this many rows are queued
+    max_wait_ms : float — longest time a row may wait for companions
+    """
+
+    def __init__(
+        self,
+        predict_fn: Callable[[np.ndarray], np.ndarray] | None = None,
+        max_batch_size: int = 64,
+        max_wait_ms: float = 2.0,
+    ):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be >= 1")
+        self.predict_fn = predict_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait_s = max_wait_ms / 1000
+        self.batch_size_hist = Histogram(
+            "fraud_microbatch_size", BATCH_SIZE_BUCKETS, "Rows per flushed micro-batch"
+        )
+        self.queue_wait_hist = Histogram(
+            "fraud_microbatch_queue_wait_ms",
+            LATENCY_MS_BUCKETS,
+            "Time a row waited in the micro-batch queue (ms)",
+        )
+        self._queue: asyncio.Queue | None = None
+        self._task: asyncio.Task | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    async def submit(
+        self,
+        row: np.ndarray,
+        predict_fn: Callable[[np.ndarray], np.ndarray] | None = None,
+    ) -> float:
+        """Queue one feature row and wait for its score (``predict_fn`` overrides the default)."""
+        predict_fn = predict_fn or self.predict_fn
+        if predict_fn is None:
+            raise ValueError("No predict_fn given to MicroBatcher or submit()")
+        loop = asyncio.get_running_loop()
+        # (Re)start the flusher lazily — also covers a new event loop (tests, reloads)
+        if self._task is None or self._task.done() or self._loop is not loop:
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._task = loop.create_task(self._run())
+        future = loop.create_future()
+        self._queue.put_nowait((row, future, time.perf_counter(), predict_fn))
+        return await future
+
+    async def close(self) -> None:
+        """Stop the background flusher once everything already queued is scored."""
+        if self._task is None:
+            return
+        self._queue.put_nowait(None)
+        await self._task
+        self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait_s * 1000,
+            "batch_size": self.batch_size_hist.snapshot(),
+            "queue_wait_ms": self.queue_wait_hist.snapshot(),
+        }
+
+    # ── internals ────────────────────────────────────────────────────
+
+    async def _run(self) -> None:
+        while True:
+            first = await self._queue.get()
+            if first is None:
+                return
+            batch, stop = await self._collect(first)
+            await self._flush(batch)
+            if stop:
+                return
+
+    async def _collect(self, first: tuple) -> tuple[list[tuple], bool]:
+        batch = [first]
+        deadline = first[2] + self.max_wait_s
+        while len(batch) < self.max_batch_size:
+            try:
+                item = self._queue.get_nowait()
+            except asyncio.QueueEmpty:
+                timeout = deadline - time.perf_counter()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+            if item is None:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    async def _flush(self, batch: list[tuple]) -> None:
+        now = time.perf_counter()
+        for _, _, enqueued, _ in batch:
+            self.queue_wait_hist.observe((now - enqueued) * 1000)
+        self.batch_size_hist.observe(len(batch))
+
+        groups: dict[Callable, list[tuple]] = {}
+        for item in batch:
+            groups.setdefault(item[3], []).append(item)
+
+        loop = asyncio.get_running_loop()
+        for predict_fn, items in groups.items():
+            x = np.vstack([row for row, _, _, _ in items])
+            try:
+                scores = await loop.run_in_executor(None, predict_fn, x)
+            except Exception as exc:  # propagate to every waiting caller
+                for _, future, _, _ in items:
+                    if not future.done():
+                        future.set_exception(exc)
+                continue
+            for (_, future, _, _), score in zip(items, scores):
+                if not future.done():  # caller may have disconnected
+                    future.set_result(float(score))
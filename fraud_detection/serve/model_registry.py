@@ -0,0 +1,295 @@
+"""Model bundles and hot-swapping from the ML platform registry.
+
+A :class:`ModelBundle` holds everything a request needs to score with one
+model version (model, feature order, median vector, threshold, optional
+compiled engine).  Bundles are never mutated after loading, so the server
+can replace the active one with a single reference assignment: requests
+that already hold the old bundle finish on it, new requests see the new one.
+
+:class:`RegistryWatcher` polls the registry written by
+``ml_platform/demo/pipeline.py:register_model``::
+
+    model_registry/
+        v1/model.joblib
+        v1/metadata.json     ← written last, so its presence marks v1 complete
+        v2/...
+
+and loads, warms and hands over each new version from a background thread.
+"""
+
+from __future__ import annotations
+
+import copy
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from collections.abc import Callable
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from .tree_engine import CompiledTreeEnsemble
+
+logger = logging.getLogger(__name__)
+
+
+class ModelBundle:
+    """One loaded, ready-to-score model version.
+
+    Parameters
+    ----------
+    model : fitted classifier with ``predict_proba``
+    feature_cols : list[str] — column order the model expects
+    train_medians : dict — imputation values (missing keys → NaN)
+    threshold : float — decision threshold on P(fraud)
+    model_name : str
+    version : int or None — registry version (None for a standalone artefact)
+    compiled : bool — also build a :class:`CompiledTreeEnsemble` when possible
+    compiled_max_rows : int — largest batch routed to the compiled engine
+    """
+
+    def __init__(
+        self,
+        model,
+        feature_cols: list[str],
+        train_medians: dict,
+        threshold: float,
+        model_name: str,
+        version: int | None = None,
+        compiled: bool = False,
+        compiled_max_rows: int = 32,
+    ):
+        self.model = model
+        self.feature_cols = list(feature_cols)
+        self.threshold = float(threshold)
+        self.model_name = model_name
+        self.version = version
+        self.train_medians = pd.Series(train_medians, dtype=float)
+        # Built once so request handling needs no per-feature pandas lookups:
+        # a float32 median vector aligned with feature_cols (NaN where no median
+        # exists) and a column → position map for dict payloads.
+        self.median_vector = self.train_medians.reindex(self.feature_cols).to_numpy(
+            dtype=np.float32
+        )
+        self.feature_index = {col: i for i, col in enumerate(self.feature_cols)}
+        self.compiled_max_rows = compiled_max_rows
+        self.engine: CompiledTreeEnsemble | None = None
+        self.load_ms = 0.0
+        self.warm_ms = 0.0
+        if compiled:
+            self._compile()
+
+    @classmethod
+    def from_artefact(cls, artefacts: dict, version: int | None = None, **kwargs) -> ModelBundle:
+        """Build from the dict written by ``fraud_detection/demo/train_model.py``."""
+        return cls(
+            model=artefacts["model"],
+            feature_cols=artefacts["feature_cols"],
+            train_medians=artefacts.get("train_medians", {}),
+            threshold=artefacts.get("threshold", 0.5),
+            model_name=artefacts.get("model_name", type(artefacts["model"]).__name__),
+            version=version,
+            **kwargs,
+        )
+
+    @classmethod
+    def load(cls, path: str | Path, **kwargs) -> ModelBundle:
+        """Load a standalone ``fraud_model.joblib`` artefact."""
+        t0 = time.perf_counter()
+        bundle = cls.from_artefact(joblib.load(path), **kwargs)
+        bundle.load_ms = (time.perf_counter() - t0) * 1000
+        return bundle
+
+    @classmethod
+    def load_version(cls, version_dir: str | Path, **kwargs) -> ModelBundle:
+        """Load one ``v<N>/`` registry entry.
+
+        ``model.joblib`` may hold a full serving artefact (dict) or a bare
+        estimator, as ``register_model`` writes it.  For a bare estimator the
+        feature order comes from ``feature_name_`` / ``feature_names_in_`` and
+        the threshold / medians from ``metadata.json`` when present.
+        """
+        t0 = time.perf_counter()
+        version_dir = Path(version_dir)
+        with open(version_dir / "metadata.json") as f:
+            metadata = json.load(f)
+        obj = joblib.load(version_dir / "model.joblib")
+        version = metadata.get("version")
+
+        if isinstance(obj, dict):
+            bundle = cls.from_artefact(obj, version=version, **kwargs)
+        else:
+            feature_cols = getattr(obj, "feature_name_", None)
+            if feature_cols is None:
+                feature_cols = getattr(obj, "feature_names_in_", None)
+            if feature_cols is None:
+                raise ValueError(f"{version_dir}: cannot determine the model's feature columns")
+            bundle = cls(
+                model=obj,
+                feature_cols=list(feature_cols),
+                train_medians=metadata.get("train_medians", {}),
+                threshold=metadata.get("threshold", 0.5),
+                model_name=metadata.get("model_name", type(obj).__name__),
+                version=version,
+                **kwargs,
+            )
+        bundle.load_ms = (time.perf_counter() - t0) * 1000
+        return bundle
+
+    def score(self, x: np.ndarray) -> np.ndarray:
+        """P(fraud) for each row of an already imputed (n_rows, n_features) matrix."""
+        # The compiled engine wins on small inputs; LightGBM's native loop wins on large ones
+        if self.engine is not None and len(x) <= self.compiled_max_rows:
+            return self.engine.predict_proba(x)[:, 1]
+        return self.model.predict_proba(x)[:, 1]
+
+    def with_shared_arrays(self, directory: str | Path) -> ModelBundle:
+        """A copy of this bundle whose large NumPy tables are read-only memory maps.
+
+        Used by the pre-fork launcher before any request is served: forked
+        workers then map the same page-cache pages instead of each touching
+        (and copying) them.  The tables are written once per ``directory``:
+        a worker hot-swapping in a version another worker already published
+        maps the existing files.  ``self`` is left as it is; swap the copy in.
+        """
+        directory = Path(directory)
+        if not (directory / "median_vector.npy").exists():
+            # Write to a private staging dir, then rename it into place — the
+            # rename is atomic, so concurrent workers agree on a single copy.
+            staging = directory.with_name(f".{directory.name}.{os.getpid()}")
+            staging.mkdir(parents=True, exist_ok=True)
+            np.save(staging / "median_vector.npy", self.median_vector)
+            if self.engine is not None:
+                self.engine.save(staging / "engine")
+            try:
+                staging.rename(directory)
+            except OSError:  # another worker published first
+                shutil.rmtree(staging, ignore_errors=True)
+        shared = copy.copy(self)
+        shared.median_vector = np.load(directory / "median_vector.npy", mmap_mode="r")
+        if self.engine is not None:
+            shared.engine = CompiledTreeEnsemble.load(directory / "engine")
+        return shared
+
+    def warm_up(self, repeats: int = 3) -> float:
+        """Push a few batches through every scoring path so the first request is not cold."""
+        t0 = time.perf_counter()
+        probe = np.nan_to_num(self.median_vector).reshape(1, -1)
+        for n_rows in (1, self.compiled_max_rows + 1):
+            batch = np.repeat(probe, n_rows, axis=0)
+            for _ in range(repeats):
+                self.score(batch)
+        self.warm_ms = (time.perf_counter() - t0) * 1000
+        return self.warm_ms
+
+    def _compile(self) -> None:
+        try:
+            engine = CompiledTreeEnsemble.from_lgbm(self.model)
+        except (NotImplementedError, AttributeError) as exc:
+            logger.warning("Compiled backend unavailable (%s) — using %s", exc, self.model_name)
+            return
+        probe = np.nan_to_num(self.median_vector).reshape(1, -1)
+        if not np.allclose(engine.predict_proba(probe), self.model.predict_proba(probe), atol=1e-9):
+            raise RuntimeError("Compiled tree engine disagrees with LightGBM on the median row")
+        self.engine = engine
+        logger.info("Compiled backend: %d trees, depth %d", engine.n_trees, engine.max_depth)
+
+
+# ---------------------------------------------------------------------------
+# Registry watcher
+# ---------------------------------------------------------------------------
+
+
+def latest_version(registry_dir: str | Path) -> int | None:
+    """Highest complete ``v<N>`` in the registry (``metadata.json`` present)."""
+    registry_dir = Path(registry_dir)
+    if not registry_dir.exists():
+        return None
+    versions = [
+        int(d.name[1:])
+        for d in registry_dir.iterdir()
+        if d.is_dir() and d.name[:1] == "v" and d.name[1:].isdigit()
+        and (d / "metadata.json").exists()
+    ]
+    return max(versions, default=None)
+
+
+class RegistryWatcher:
+    """Poll a model registry and hand each newer, warmed-up version to ``on_swap``.
+
+    Parameters
+    ----------
+    registry_dir : path — directory holding ``v<N>/`` entries
+    on_swap : callable — receives the new :class:`ModelBundle`; must swap it in
+    current_version : int or None — version already being served
+    poll_interval_s : float
+    bundle_kwargs : forwarded to :meth:`ModelBundle.load_version`
+    """
+
+    def __init__(
+        self,
+        registry_dir: str | Path,
+        on_swap: Callable[[ModelBundle], None],
+        current_version: int | None = None,
+        poll_interval_s: float = 5.0,
+        **bundle_kwargs,
+    ):
+        self.registry_dir = Path(registry_dir)
+        self.on_swap = on_swap
+        self.current_version = current_version
+        self.poll_interval_s = poll_interval_s
+        self.bundle_kwargs = bundle_kwargs
+        self.failed_versions: set[int] = set()
+        self.last_swap: dict | None = None
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def poll_once(self) -> bool:
+        """Load and swap in the newest version if there is one.  Returns True on swap."""
+        version = latest_version(self.registry_dir)
+        if version is None or version in self.failed_versions:
+            return False
+        if self.current_version is not None and version <= self.current_version:
+            return False
+
+        t0 = time.perf_counter()
+        try:
+            bundle = ModelBundle.load_version(self.registry_dir / f"v{version}", **self.bundle_kwargs)
+            bundle.warm_up()
+        except Exception:
+            logger.exception("Failed to load registry version v%d — keeping current model", version)
+            self.failed_versions.add(version)
+            return False
+
+        t_swap = time.perf_counter()
+        self.on_swap(bundle)
+        done = time.perf_counter()
+        self.current_version = version
+        self.last_swap = {
+            "version": version,
+            "load_ms": round(bundle.load_ms, 2),
+            "warm_ms": round(bundle.warm_ms, 2),
+            "swap_ms": round((done - t_swap) * 1000, 4),
+            "total_ms": round((done - t0) * 1000, 2),
+        }
+        logger.info("Swapped in registry v%d  %s", version, self.last_swap)
+        return True
+
+    def start(self) -> RegistryWatcher:
+        self._thread = threading.Thread(target=self._run, name="registry-watcher", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.poll_interval_s):
+            self.poll_once()
@@ -0,0 +1,90 @@
+"""Bounded LRU + TTL cache of scores for idempotent re-scoring.
+
+Upstream retries and duplicate webhook deliveries send the exact same
+feature vector several times.  Entries are keyed by a 128-bit BLAKE2b digest
+of the imputed float32 row (feature order included) together with the
+model version, so a hit is only possible for the same model.  The server
+also clears the cache whenever it swaps models.
+
+Eviction: least recently used once ``maxsize`` entries are held; entries
+older than ``ttl_s`` are treated as misses and dropped when touched.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from .metrics import Counter
+
+
+class ResultCache:
+    """Thread-safe LRU cache mapping (model version, feature row) → P(fraud).
+
+    Parameters
+    ----------
+    maxsize : int — maximum number of cached rows
+    ttl_s : float — seconds an entry stays valid (``0`` = no expiry)
+    """
+
+    def __init__(self, maxsize: int = 100_000, ttl_s: float = 300.0):
+        if maxsize < 1:
+            raise ValueError("maxsize must be >= 1")
+        self.maxsize = maxsize
+        self.ttl_s = ttl_s
+        self._data: OrderedDict[tuple, tuple[float, float]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = Counter("fraud_cache_hits_total", "Result-cache hits")
+        self.misses = Counter("fraud_cache_misses_total", "Result-cache misses")
+        self.evictions = Counter("fraud_cache_evictions_total", "LRU evictions and TTL expiries")
+
+    @staticmethod
+    def key(version, row: np.ndarray) -> tuple:
+        digest = hashlib.blake2b(np.ascontiguousarray(row).tobytes(), digest_size=16).digest()
+        return version, digest
+
+    def get(self, key: tuple) -> float | None:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and self.ttl_s and entry[1] < time.monotonic():
+                del self._data[key]
+                self.evictions.inc()
+                entry = None
+            if entry is None:
+                self.misses.inc()
+                return None
+            self._data.move_to_end(key)
+        self.hits.inc()
+        return entry[0]
+
+    def put(self, key: tuple, prob: float) -> None:
+        expires = time.monotonic() + self.ttl_s if self.ttl_s else float("inf")
+        with self._lock:
+            self._data[key] = (prob, expires)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions.inc()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        hits, misses = self.hits.value, self.misses.value
+        return {
+            "size": len(self),
+            "maxsize": self.maxsize,
+            "ttl_s": self.ttl_s,
+            "hits": hits,
+            "misses": misses,
+            "evictions": self.evictions.value,
+            "hit_rate": round(hits / (hits + misses), 6) if hits + misses else 0.0,
+        }
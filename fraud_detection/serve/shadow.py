@@ -0,0 +1,150 @@
+"""Shadow (challenger) scoring off the response path.
+
+A configurable fraction of live traffic is also scored by a second model
+version.  The champion's response is returned immediately; the challenger
+runs later in a small worker pool and only feeds rolling comparison
+statistics (agreement rate, score deltas, flag rates).  When the pool is
+saturated new work is dropped rather than queued, so shadow scoring can
+never back up into request latency.
+
+The statistics complement the offline AUC comparison in
+``ml_platform/demo/pipeline.py:select_champion`` — see its
+``shadow_stats`` argument.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from .model_registry import ModelBundle
+
+logger = logging.getLogger(__name__)
+
+
+class ShadowScorer:
+    """Score a sample of traffic with a challenger bundle in the background.
+
+    Parameters
+    ----------
+    challenger : ModelBundle
+    fraction : float — share of rows also scored by the challenger
+    max_workers : int — size of the background pool
+    max_pending : int — rows allowed in flight before new work is dropped
+    window : int — number of most recent rows kept for rolling statistics
+    seed : int or None — sampling seed (for reproducible tests)
+    """
+
+    def __init__(
+        self,
+        challenger: ModelBundle,
+        fraction: float = 0.1,
+        max_workers: int = 1,
+        max_pending: int = 10_000,
+        window: int = 10_000,
+        seed: int | None = None,
+    ):
+        self.challenger = challenger
+        self.fraction = fraction
+        self.max_pending = max_pending
+        self._rng = np.random.default_rng(seed)
+        self._pool = ThreadPoolExecutor(max_workers, thread_name_prefix="shadow")
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._deltas: deque[float] = deque(maxlen=window)
+        self._agree: deque[bool] = deque(maxlen=window)
+        self._champion_flags: deque[bool] = deque(maxlen=window)
+        self._challenger_flags: deque[bool] = deque(maxlen=window)
+        self._align_cache: tuple[ModelBundle, np.ndarray] | None = None  # last champion only
+        self.counts = {"sampled": 0, "scored": 0, "dropped": 0, "errors": 0}
+
+    def submit(self, champion: ModelBundle, x: np.ndarray, champion_probs: np.ndarray) -> int:
+        """Sample rows of an imputed champion matrix for shadow scoring.
+
+        Returns the number of rows handed to the pool (O(1) for the caller).
+        """
+        mask = self._rng.random(len(x)) < self.fraction
+        n = int(mask.sum())
+        if n == 0:
+            return 0
+        with self._lock:
+            self.counts["sampled"] += n
+            if self._pending + n > self.max_pending:
+                self.counts["dropped"] += n
+                return 0
+            self._pending += n
+        self._pool.submit(self._score, champion, x[mask], np.asarray(champion_probs)[mask])
+        return n
+
+    def stats(self) -> dict:
+        with self._lock:
+            deltas = np.array(self._deltas)
+            agree = np.array(self._agree)
+            champ = np.array(self._champion_flags)
+            chall = np.array(self._challenger_flags)
+            counts = dict(self.counts)
+            pending = self._pending
+        out = {
+            "challenger": self.challenger.model_name,
+            "challenger_version": self.challenger.version,
+            "fraction": self.fraction,
+            **counts,
+            "pending": pending,
+            "window": len(deltas),
+        }
+        if len(deltas):
+            out.update(
+                {
+                    "agreement_rate": round(float(agree.mean()), 6),
+                    "mean_delta": round(float(deltas.mean()), 6),
+                    "mean_abs_delta": round(float(np.abs(deltas).mean()), 6),
+                    "p95_abs_delta": round(float(np.percentile(np.abs(deltas), 95)), 6),
+                    "champion_flag_rate": round(float(champ.mean()), 6),
+                    "challenger_flag_rate": round(float(chall.mean()), 6),
+                }
+            )
+        return out
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=True)
+
+    # ── internals ────────────────────────────────────────────────────
+
+    def _align(self, champion: ModelBundle, x: np.ndarray) -> np.ndarray:
+        """Re-order champion columns into the challenger's feature layout."""
+        if champion.feature_cols == self.challenger.feature_cols:
+            return x
+        # One entry, replaced on a hot-swap, so old champions are not kept alive
+        with self._lock:
+            cached = self._align_cache
+            if cached is None or cached[0] is not champion:
+                src = [champion.feature_index.get(c, -1) for c in self.challenger.feature_cols]
+                cached = self._align_cache = (champion, np.array(src))
+        src = cached[1]
+        out = np.full((len(x), len(src)), np.nan, dtype=np.float32)
+        present = src >= 0
+        out[:, present] = x[:, src[present]]
+        return np.where(np.isnan(out), self.challenger.median_vector, out)
+
+    def _score(self, champion: ModelBundle, x: np.ndarray, champion_probs: np.ndarray) -> None:
+        try:
+            probs = self.challenger.score(self._align(champion, x))
+        except Exception:
+            logger.exception("Shadow scoring failed")
+            with self._lock:
+                self._pending -= len(x)
+                self.counts["errors"] += len(x)
+            return
+        champ_flags = champion_probs >= champion.threshold
+        chall_flags = probs >= self.challenger.threshold
+        with self._lock:
+            self._pending -= len(x)
+            self.counts["scored"] += len(x)
+            self._deltas.extend((probs - champion_probs).tolist())
+            self._agree.extend((champ_flags == chall_flags).tolist())
+            self._champion_flags.extend(champ_flags.tolist())
+            self._challenger_flags.extend(chall_flags.tolist())
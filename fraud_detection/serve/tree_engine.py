@@ -0,0 +1,255 @@
+"""Compiled tree-ensemble inference for LightGBM binary classifiers.
+
+The sklearn wrapper runs input validation and booster dispatch on every
+``predict_proba`` call, which dominates the cost of scoring a single row.
+This module exports the booster's trees once, at load time, into flat NumPy
+node tables and evaluates all trees at once with a vectorised traversal:
+
+    node[row, tree] ← left/right child of node[row, tree]    (max_depth times)
+
+Leaves point at themselves, so every row/tree pair can take the same number
+of steps regardless of where it terminates.
+
+Missing values follow LightGBM's rules for numerical splits:
+- ``missing_type=None`` — NaN is treated as 0.0
+- ``missing_type=Zero`` — 0 (and NaN) go to the default child
+- ``missing_type=NaN``  — NaN goes to the default child
+
+Categorical splits and multiclass boosters are not supported; callers should
+fall back to the regular LightGBM path for those models.
+
+The node tables can be written to ``.npy`` files and re-opened memory-mapped
+(:meth:`CompiledTreeEnsemble.save` / :meth:`CompiledTreeEnsemble.load`) so
+forked serving workers share one copy through the page cache.
+
+Benchmark (from ``fraud_detection/``):
+    python -m serve.tree_engine [path/to/fraud_model.joblib]
+"""
+
+from __future__ import annotations
+
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+_MISSING_NONE, _MISSING_ZERO, _MISSING_NAN = 0, 1, 2
+_MISSING_TYPES = {"None": _MISSING_NONE, "Zero": _MISSING_ZERO, "NaN": _MISSING_NAN}
+_K_ZERO_THRESHOLD = 1e-35  # LightGBM's kZeroThreshold
+
+
+class CompiledTreeEnsemble:
+    """Flat-array representation of a LightGBM binary classifier.
+
+    Build with :meth:`from_lgbm`; score with :meth:`predict_proba`, which
+    mirrors ``LGBMClassifier.predict_proba`` for one row or a batch.
+    """
+
+    def __init__(
+        self,
+        feature: np.ndarray,
+        threshold: np.ndarray,
+        left: np.ndarray,
+        right: np.ndarray,
+        default_left: np.ndarray,
+        missing_type: np.ndarray,
+        value: np.ndarray,
+        roots: np.ndarray,
+        max_depth: int,
+        n_features: int,
+        sigmoid: float = 1.0,
+    ):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.default_left = default_left
+        self.missing_type = missing_type
+        self.value = value
+        self.roots = roots
+        self.max_depth = max_depth
+        self.n_features = n_features
+        self.sigmoid = sigmoid
+
+    @classmethod
+    def from_lgbm(cls, model) -> CompiledTreeEnsemble:
+        """Compile an ``LGBMClassifier`` (or a raw ``lightgbm.Booster``)."""
+        booster = getattr(model, "booster_", model)
+        dump = booster.dump_model()
+        if dump.get("num_class", 1) != 1:
+            raise NotImplementedError("Only binary / single-output boosters are supported")
+        objective = dump.get("objective", "")
+        if not objective.startswith("binary"):
+            raise NotImplementedError(f"Unsupported objective: {objective!r}")
+        sigmoid = 1.0
+        for token in objective.split():
+            if token.startswith("sigmoid:"):
+                sigmoid = float(token.split(":", 1)[1])
+
+        nodes: dict[str, list] = {
+            k: [] for k in ("feature", "threshold", "left", "right", "default_left", "missing", "value")
+        }
+        roots, max_depth = [], 0
+
+        def add(node: dict, depth: int) -> int:
+            nonlocal max_depth
+            idx = len(nodes["feature"])
+            for k in nodes:
+                nodes[k].append(0)
+            if "leaf_value" in node:
+                max_depth = max(max_depth, depth)
+                nodes["left"][idx] = nodes["right"][idx] = idx
+                nodes["value"][idx] = node["leaf_value"]
+                return idx
+            if node["decision_type"] != "<=":
+                raise NotImplementedError("Categorical splits are not supported")
+            nodes["feature"][idx] = node["split_feature"]
+            nodes["threshold"][idx] = node["threshold"]
+            nodes["default_left"][idx] = node["default_left"]
+            nodes["missing"][idx] = _MISSING_TYPES[node["missing_type"]]
+            nodes["left"][idx] = add(node["left_child"], depth + 1)
+            nodes["right"][idx] = add(node["right_child"], depth + 1)
+            return idx
+
+        for tree in dump["tree_info"]:
+            roots.append(add(tree["tree_structure"], 0))
+
+        return cls(
+            feature=np.asarray(nodes["feature"], dtype=np.int32),
+            threshold=np.asarray(nodes["threshold"], dtype=np.float64),
+            left=np.asarray(nodes["left"], dtype=np.int32),
+            right=np.asarray(nodes["right"], dtype=np.int32),
+            default_left=np.asarray(nodes["default_left"], dtype=bool),
+            missing_type=np.asarray(nodes["missing"], dtype=np.int8),
+            value=np.asarray(nodes["value"], dtype=np.float64),
+            roots=np.asarray(roots, dtype=np.int32),
+            max_depth=max_depth,
+            n_features=dump["max_feature_idx"] + 1,
+            sigmoid=sigmoid,
+        )
+
+    _ARRAYS = (
+        "feature",
+        "threshold",
+        "left",
+        "right",
+        "default_left",
+        "missing_type",
+        "value",
+        "roots",
+    )
+
+    def save(self, directory: str | Path) -> Path:
+        """Write node tables as ``.npy`` files plus a small ``meta.json``."""
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        for name in self._ARRAYS:
+            np.save(directory / f"{name}.npy", np.ascontiguousarray(getattr(self, name)))
+        meta = {"max_depth": self.max_depth, "n_features": self.n_features, "sigmoid": self.sigmoid}
+        with open(directory / "meta.json", "w") as f:
+            json.dump(meta, f)
+        return directory
+
+    @classmethod
+    def load(cls, directory: str | Path, mmap_mode: str | None = "r") -> CompiledTreeEnsemble:
+        """Re-open tables written by :meth:`save` (memory-mapped read-only by default)."""
+        directory = Path(directory)
+        with open(directory / "meta.json") as f:
+            meta = json.load(f)
+        arrays = {name: np.load(directory / f"{name}.npy", mmap_mode=mmap_mode) for name in cls._ARRAYS}
+        return cls(**arrays, **meta)
+
+    @property
+    def n_trees(self) -> int:
+        return len(self.roots)
+
+    def predict_raw(self, x: np.ndarray, chunk_size: int = 4096) -> np.ndarray:
+        """Raw margin (sum of leaf values) for each row of ``x``."""
+        x = np.asarray(x, dtype=np.float64)
+        if x.ndim == 1:
+            x = x.reshape(1, -1)
+        if x.shape[1] != self.n_features:
+            raise ValueError(f"Expected {self.n_features} features, got {x.shape[1]}")
+        if not len(x):
+            return np.empty(0)
+        # Chunking bounds the (rows × trees) working set for large batches
+        return np.concatenate(
+            [self._traverse(x[i : i + chunk_size]) for i in range(0, len(x), chunk_size)]
+        )
+
+    def predict_proba(self, x: np.ndarray) -> np.ndarray:
+        """``(n_rows, 2)`` class probabilities, like ``LGBMClassifier.predict_proba``."""
+        p = 1.0 / (1.0 + np.exp(-self.sigmoid * self.predict_raw(x)))
+        return np.column_stack([1.0 - p, p])
+
+    def _traverse(self, x: np.ndarray) -> np.ndarray:
+        rows = np.arange(len(x))[:, None]
+        node = np.repeat(self.roots[None, :], len(x), axis=0)
+        # Fast path: no value can take a "missing" branch, so a plain compare suffices
+        has_zero_splits = bool((self.missing_type == _MISSING_ZERO).any())
+        plain = not (np.isnan(x).any() or (has_zero_splits and (x == 0).any()))
+        for _ in range(self.max_depth):
+            val = x[rows, self.feature[node]]
+            if plain:
+                node = np.where(val <= self.threshold[node], self.left[node], self.right[node])
+                continue
+            mtype = self.missing_type[node]
+            is_nan = np.isnan(val)
+            val = np.where(is_nan & (mtype != _MISSING_NAN), 0.0, val)
+            missing = ((mtype == _MISSING_ZERO) & (np.abs(val) <= _K_ZERO_THRESHOLD)) | (
+                (mtype == _MISSING_NAN) & is_nan
+            )
+            go_left = np.where(missing, self.default_left[node], val <= self.threshold[node])
+            node = np.where(go_left, self.left[node], self.right[node])
+        return self.value[node].sum(axis=1)
+
+
+# ---------------------------------------------------------------------------
+# Benchmark
+# ---------------------------------------------------------------------------
+
+
+def _time_per_call(fn, x: np.ndarray, repeats: int) -> float:
+    fn(x)  # warm-up
+    t0 = time.perf_counter()
+    for _ in range(repeats):
+        fn(x)
+    return (time.perf_counter() - t0) / repeats * 1000
+
+
+def benchmark(model, n_features: int, seed: int = 42) -> list[dict]:
+    """Compare ``predict_proba`` latency of LightGBM vs the compiled engine."""
+    engine = CompiledTreeEnsemble.from_lgbm(model)
+    rng = np.random.RandomState(seed)
+    rows = []
+    for batch_size, repeats in ((1, 500), (64, 200), (1024, 50), (8192, 5)):
+        x = rng.lognormal(4.0, 2.0, size=(batch_size, n_features))
+        ref = model.predict_proba(x)[:, 1]
+        got = engine.predict_proba(x)[:, 1]
+        lgbm_ms = _time_per_call(model.predict_proba, x, repeats)
+        compiled_ms = _time_per_call(engine.predict_proba, x, repeats)
+        rows.append(
+            {
+                "batch_size": batch_size,
+                "lightgbm_ms": round(lgbm_ms, 4),
+                "compiled_ms": round(compiled_ms, 4),
+                "speedup": round(lgbm_ms / compiled_ms, 2),
+                "max_abs_diff": float(np.max(np.abs(ref - got))),
+            }
+        )
+    return rows
+
+
+if __name__ == "__main__":
+    import joblib
+
+    default = Path(__file__).resolve().parents[1] / "demo" / "results" / "fraud_model.joblib"
+    artefacts = joblib.load(sys.argv[1] if len(sys.argv) > 1 else default)
+    print(f"{'batch':>6} {'lightgbm ms':>12} {'compiled ms':>12} {'speedup':>8} {'max |diff|':>11}")
+    for r in benchmark(artefacts["model"], len(artefacts["feature_cols"])):
+        print(
+            f"{r['batch_size']:>6} {r['lightgbm_ms']:>12.4f} {r['compiled_ms']:>12.4f} "
+            f"{r['speedup']:>8.2f} {r['max_abs_diff']:>11.2e}"
+        )
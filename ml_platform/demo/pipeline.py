@@ -250,7 +250,29 @@ def train_and_evaluate(df: pd.DataFrame, seed: int = 42) -> dict:
 # ---------------------------------------------------------------------------
 
 
-def select_champion(results: dict, prod_metrics: dict = None) -> str:
+def passes_shadow_check(
+    shadow_stats: dict,
+    min_samples: int = 1000,
+    min_agreement: float = 0.9,
+    max_flag_rate_ratio: float = 2.0,
+) -> bool:
+    """Online sanity gate from shadow scoring (fraud serve ``/shadow/stats``).
+
+    Offline AUC can look fine while the challenger misbehaves on live traffic
+    (feature skew, a different score scale).  Require enough shadowed rows,
+    a minimum decision agreement with production, and a flag rate that has
+    not exploded relative to production.
+    """
+    if shadow_stats.get("scored", 0) < min_samples:
+        return False
+    if shadow_stats.get("agreement_rate", 0.0) < min_agreement:
+        return False
+    champion_rate = shadow_stats.get("champion_flag_rate", 0.0)
+    challenger_rate = shadow_stats.get("challenger_flag_rate", 0.0)
+    return challenger_rate <= max(champion_rate, 1e-6) * max_flag_rate_ratio
+
+
+def select_champion(results: dict, prod_metrics: dict = None, shadow_stats: dict = None) -> str:
     challenger_name = max(results, key=lambda k: results[k]["metrics"]["ROC-AUC"])
     challenger_auc = results[challenger_name]["metrics"]["ROC-AUC"]
 
@@ -260,6 +282,9 @@ def select_champion(results: dict, prod_metrics: dict = None) -> str:
         print(f"  Production: {prod_auc:.4f}")
 
         if challenger_auc > prod_auc:
+            if shadow_stats is not None and not passes_shadow_check(shadow_stats):
+                print("  [!] REJECTED: Challenger won offline but failed the shadow-traffic check.")
+                return None
             print(f"  [*] SUCCESS: Challenger outperformed Production. Selecting {challenger_name}.")
             return challenger_name
         else:
@@ -0,0 +1,227 @@
+"""Array-backed batch feature store.
+
+``generate_feature_store`` models the store as ``dict[entity_id -> dict]``,
+which costs a dict merge and a one-row DataFrame per scored event.  Here the
+batch features live in one float32 matrix whose columns are contiguous, next
+to a sorted entity-id array: a lookup is a binary search plus a row slice,
+and many entities are gathered with one vectorised ``searchsorted``.
+
+A refresh (the 6-hourly batch job) builds the new arrays off to the side and
+publishes them with a single reference assignment, so concurrent readers see
+either the old snapshot or the new one, never a mix.
+
+Snapshots on disk (``write_snapshot`` / ``FeatureStore.open_snapshot``) are a
+single file laid out for ``np.memmap``::
+
+    b"FSTORE\\x00\\x01"  magic (8 bytes)
+    uint64 LE         JSON header length
+    JSON header       format, version, n_entities, n_rows_padded, columns,
+                      index_offset, data_offset
+    int64[n]          sorted entity ids               (64-byte aligned)
+    float32[k][n_pad] one contiguous block per column (64-byte aligned)
+
+Opening one maps the file read-only: no parsing, no per-entity Python work,
+and processes that open the same snapshot share its page-cache pages.
+Writers go through a temporary file and ``os.replace``, so readers never
+see a partial snapshot.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import struct
+import time
+from pathlib import Path
+
+import numpy as np
+
+SNAPSHOT_MAGIC = b"FSTORE\x00\x01"
+SNAPSHOT_FORMAT = 1
+_ALIGN = 64
+
+# Batch-computed columns, in the order ``online_inference.FEATURE_COLS`` uses them
+STORE_COLS = [
+    "avg_daily_spend_30d",
+    "txn_count_7d",
+    "distinct_merchants_30d",
+    "merchant_freq",
+    "velocity_1h",
+]
+
+
+class FeatureStore:
+    """Entity → float32 batch-feature row lookups over columnar arrays.
+
+    Parameters
+    ----------
+    entity_ids : array-like of int — one per row, any order, no duplicates
+    values : (n_entities, n_columns) array — feature values per entity
+    columns : list[str] — column names (default :data:`STORE_COLS`)
+
+    Unknown entities get a row of zeros, matching the dict store's fallback.
+    """
+
+    def __init__(self, entity_ids, values, columns: list[str] | None = None):
+        self.columns = list(columns or STORE_COLS)
+        self.version = 0
+        self.refreshed_at = 0.0
+        self._zeros = np.zeros(len(self.columns), dtype=np.float32)
+        self.refresh(entity_ids, values)
+
+    @classmethod
+    def from_dict(cls, store: dict, columns: list[str] | None = None) -> FeatureStore:
+        """Convert a ``generate_feature_store``-style dict of dicts."""
+        columns = list(columns or STORE_COLS)
+        ids = np.fromiter(store.keys(), dtype=np.int64, count=len(store))
+        values = np.array(
+            [[feats.get(c, 0.0) for c in columns] for feats in store.values()], dtype=np.float32
+        ).reshape(len(store), len(columns))
+        return cls(ids, values, columns)
+
+    def refresh(self, entity_ids, values) -> None:
+        """Atomically replace the whole snapshot with new batch output."""
+        ids = np.asarray(entity_ids, dtype=np.int64)
+        values = np.asarray(values, dtype=np.float32)
+        if values.shape != (len(ids), len(self.columns)):
+            raise ValueError(
+                f"Expected values of shape ({len(ids)}, {len(self.columns)}), got {values.shape}"
+            )
+        order = np.argsort(ids, kind="stable")
+        ids = ids[order]
+        if len(ids) > 1 and (ids[1:] == ids[:-1]).any():
+            raise ValueError("Duplicate entity ids in feature store refresh")
+        self._publish(ids, np.asfortranarray(values[order]))
+
+    @classmethod
+    def open_snapshot(cls, path: str | Path) -> FeatureStore:
+        """Memory-map a snapshot written by :func:`write_snapshot`."""
+        header = read_snapshot_header(path)
+        columns = header["columns"]
+        store = cls(np.empty(0, dtype=np.int64), np.empty((0, len(columns))), columns)
+        store.load_snapshot(path)
+        return store
+
+    def load_snapshot(self, path: str | Path) -> None:
+        """Atomically switch to a (newer) snapshot file, e.g. after the batch refresh."""
+        header = read_snapshot_header(path)
+        if header["columns"] != self.columns:
+            raise ValueError(f"{path}: snapshot columns {header['columns']} != {self.columns}")
+        n, n_pad, k = header["n_entities"], header["n_rows_padded"], len(self.columns)
+        if n == 0:  # nothing to map
+            self._publish(np.empty(0, dtype=np.int64), np.empty((0, k), dtype=np.float32))
+            self.snapshot_version = header["version"]
+            return
+        ids = np.memmap(path, dtype="<i8", mode="r", offset=header["index_offset"], shape=(n,))
+        matrix = np.memmap(
+            path, dtype="<f4", mode="r", offset=header["data_offset"], shape=(n_pad, k), order="F"
+        )
+        # Plain ndarray views: same pages, without memmap's per-slice subclass overhead
+        self._publish(ids.view(np.ndarray), matrix.view(np.ndarray)[:n])
+        self.snapshot_version = header["version"]
+
+    def _publish(self, ids: np.ndarray, matrix: np.ndarray) -> None:
+        self._state = (ids, matrix)  # single assignment — readers never see a half refresh
+        self.version += 1
+        self.refreshed_at = time.time()
+
+    def __len__(self) -> int:
+        return len(self._state[0])
+
+    @property
+    def entity_ids(self) -> np.ndarray:
+        """Sorted entity ids; position ``i`` is the entity of :meth:`take` row ``i``."""
+        return self._state[0]
+
+    def snapshot(self) -> tuple[np.ndarray, np.ndarray]:
+        """``(entity_ids, values)`` of one published version, never mixed across a refresh."""
+        return self._state
+
+    def take(self, positions) -> np.ndarray:
+        """Rows by store position (no id lookup) — one fancy-indexing gather."""
+        return self._state[1][positions]
+
+    def __contains__(self, entity_id) -> bool:
+        ids = self._state[0]
+        pos = np.searchsorted(ids, entity_id)
+        return bool(pos < len(ids) and ids[pos] == entity_id)
+
+    def row(self, entity_id) -> np.ndarray:
+        """Feature row for one entity (zeros if unknown).  Do not modify in place."""
+        ids, matrix = self._state
+        pos = int(np.searchsorted(ids, entity_id))
+        if pos < len(ids) and ids[pos] == entity_id:
+            return matrix[pos]
+        return self._zeros
+
+    def gather(self, entity_ids) -> np.ndarray:
+        """(len(entity_ids), n_columns) float32 matrix; unknown entities → zeros."""
+        ids, matrix = self._state
+        query = np.asarray(entity_ids, dtype=np.int64)
+        pos = np.minimum(np.searchsorted(ids, query), max(len(ids) - 1, 0))
+        out = np.zeros((len(query), len(self.columns)), dtype=np.float32)
+        if len(ids):
+            found = ids[pos] == query
+            out[found] = matrix[pos[found]]
+        return out
+
+
+def _aligned(offset: int) -> int:
+    return -(-offset // _ALIGN) * _ALIGN
+
+
+def read_snapshot_header(path: str | Path) -> dict:
+    with open(path, "rb") as f:
+        magic = f.read(len(SNAPSHOT_MAGIC))
+        if magic != SNAPSHOT_MAGIC:
+            raise ValueError(f"{path}: not a feature store snapshot")
+        (length,) = struct.unpack("<Q", f.read(8))
+        header = json.loads(f.read(length))
+    if header.get("format") != SNAPSHOT_FORMAT:
+        raise ValueError(f"{path}: unsupported snapshot format {header.get('format')}")
+    return header
+
+
+def write_snapshot(store: FeatureStore, path: str | Path, version: int | None = None) -> Path:
+    """Write ``store`` as a memory-mappable snapshot, replacing ``path`` atomically.
+
+    ``version`` (default: the store's refresh counter) is recorded in the
+    header so readers can tell which batch run produced the file.
+    """
+    path = Path(path)
+    ids, matrix = store._state
+    n, k = matrix.shape
+    n_pad = -(-n // (_ALIGN // 4)) * (_ALIGN // 4)  # keeps every column block aligned
+    header = {
+        "format": SNAPSHOT_FORMAT,
+        "version": store.version if version is None else int(version),
+        "created_at": time.time(),
+        "n_entities": int(n),
+        "n_rows_padded": int(n_pad),
+        "columns": store.columns,
+        "index_offset": 0,
+        "data_offset": 0,
+    }
+    # The offsets depend on the header's length and vice versa: size the header
+    # with wide placeholder offsets, then space-pad the real one to that length.
+    header["index_offset"] = header["data_offset"] = 10**15
+    prefix = len(SNAPSHOT_MAGIC) + 8 + len(json.dumps(header))
+    header["index_offset"] = _aligned(prefix)
+    header["data_offset"] = _aligned(header["index_offset"] + 8 * n)
+    encoded = json.dumps(header).encode().ljust(prefix - len(SNAPSHOT_MAGIC) - 8)
+
+    padded = np.zeros((n_pad, k), dtype="<f4", order="F")
+    padded[:n] = matrix
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    with open(tmp, "wb") as f:
+        f.write(SNAPSHOT_MAGIC)
+        f.write(struct.pack("<Q", len(encoded)))
+        f.write(encoded)
+        f.write(b"\0" * (header["index_offset"] - f.tell()))
+        f.write(np.ascontiguousarray(ids, dtype="<i8").tobytes())
+        f.write(b"\0" * (header["data_offset"] - f.tell()))
+        f.write(padded.tobytes(order="F"))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    return path
@@ -0,0 +1,168 @@
+"""Streaming latency quantiles with bounded memory.
+
+Latencies land in logarithmically spaced buckets (the DDSketch / HDR
+histogram mapping): bucket ``k`` covers ``(gamma**(k-1), gamma**k]`` with
+``gamma = (1 + a) / (1 - a)``, so any reported quantile is within a relative
+error ``a`` of the exact value.  Memory is one counter per bucket — about a
+thousand integers for ``a = 1%`` between 1 µs and 1000 s — independent of how
+many latencies were seen, and two sketches merge by adding their counters.
+
+:class:`WindowedSketch` keeps a ring of per-slot counters next to the
+all-time sketch, so "last 1m / 5m / 1h" views are a sum over a handful of
+slots rather than a scan of the log.
+"""
+
+from __future__ import annotations
+
+import io
+import math
+
+import numpy as np
+
+
+class LogBucketSketch:
+    """Relative-error quantile sketch over positive values.
+
+    Parameters
+    ----------
+    relative_accuracy : float — bound on ``|estimate - exact| / exact``
+    min_value, max_value : float — values outside are clamped to the end buckets
+    """
+
+    def __init__(
+        self,
+        relative_accuracy: float = 0.01,
+        min_value: float = 1e-3,
+        max_value: float = 1e6,
+    ):
+        if not 0 < relative_accuracy < 1:
+            raise ValueError("relative_accuracy must be in (0, 1)")
+        self.relative_accuracy = relative_accuracy
+        self.min_value = min_value
+        self.max_value = max_value
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self._offset = math.ceil(math.log(min_value) / self._log_gamma)
+        self.n_buckets = math.ceil(math.log(max_value) / self._log_gamma) - self._offset + 1
+        self.counts = np.zeros(self.n_buckets, dtype=np.int64)
+
+    def bucket_index(self, values: np.ndarray) -> np.ndarray:
+        values = np.maximum(np.asarray(values, dtype=np.float64), self.min_value)
+        idx = np.ceil(np.log(values) / self._log_gamma).astype(np.int64) - self._offset
+        return np.clip(idx, 0, self.n_buckets - 1)
+
+    def add(self, value: float) -> None:
+        value = max(value, self.min_value)
+        idx = math.ceil(math.log(value) / self._log_gamma) - self._offset
+        self.counts[min(max(idx, 0), self.n_buckets - 1)] += 1
+
+    def add_many(self, values) -> None:
+        idx = self.bucket_index(values)
+        self.counts += np.bincount(idx, minlength=self.n_buckets)
+
+    def merge(self, other: LogBucketSketch) -> LogBucketSketch:
+        if (other.gamma, other._offset, other.n_buckets) != (
+            self.gamma,
+            self._offset,
+            self.n_buckets,
+        ):
+            raise ValueError("Can only merge sketches with identical bucket layouts")
+        self.counts += other.counts
+        return self
+
+    def empty_like(self) -> LogBucketSketch:
+        return LogBucketSketch(self.relative_accuracy, self.min_value, self.max_value)
+
+    @property
+    def count(self) -> int:
+        return int(self.counts.sum())
+
+    def quantiles(self, qs) -> np.ndarray:
+        """Estimates for each ``q`` in ``qs`` (0–1); NaN when the sketch is empty.
+
+        Rank ``q * (n - 1)`` is resolved to its bucket, whose midpoint (in
+        relative terms) is returned — the same rank convention as
+        ``np.percentile`` without interpolation between neighbours.
+        """
+        qs = np.asarray(qs, dtype=np.float64)
+        cumulative = np.cumsum(self.counts)
+        n = cumulative[-1]
+        if n == 0:
+            return np.full(qs.shape, np.nan)
+        idx = np.searchsorted(cumulative, np.floor(qs * (n - 1)), side="right")
+        return 2 * self.gamma ** (idx + self._offset) / (self.gamma + 1)
+
+    def quantile(self, q: float) -> float:
+        return float(self.quantiles([q])[0])
+
+
+class WindowedSketch:
+    """All-time sketch plus a ring of ``slot_s``-wide sketches covering ``horizon_s``.
+
+    Windowed views are rounded up to whole slots.
+    """
+
+    def __init__(self, slot_s: float = 10.0, horizon_s: float = 3600.0, **sketch_kwargs):
+        self.slot_s = slot_s
+        self.total = LogBucketSketch(**sketch_kwargs)
+        self.n_slots = math.ceil(horizon_s / slot_s)
+        self.slot_ids = np.full(self.n_slots, -1, dtype=np.int64)
+        self.slots = np.zeros((self.n_slots, self.total.n_buckets), dtype=np.int64)
+
+    def add_many(self, values, now: float) -> None:
+        idx = self.total.bucket_index(values)
+        counts = np.bincount(idx, minlength=self.total.n_buckets)
+        self.total.counts += counts
+        slot = int(now // self.slot_s)
+        pos = slot % self.n_slots
+        if self.slot_ids[pos] != slot:  # slot fell out of the horizon — recycle it
+            self.slot_ids[pos] = slot
+            self.slots[pos] = 0
+        self.slots[pos] += counts
+
+    def view(self, window_s: float | None, now: float) -> LogBucketSketch:
+        """Sketch over the last ``window_s`` seconds (None → all time)."""
+        if window_s is None:
+            return self.total
+        current = int(now // self.slot_s)
+        n = min(math.ceil(window_s / self.slot_s), self.n_slots)
+        live = (self.slot_ids > current - n) & (self.slot_ids <= current)
+        sketch = self.total.empty_like()
+        sketch.counts = self.slots[live].sum(axis=0)
+        return sketch
+
+    def to_bytes(self) -> bytes:
+        buffer = io.BytesIO()
+        np.savez_compressed(
+            buffer,
+            params=np.array(
+                [
+                    self.slot_s,
+                    self.total.relative_accuracy,
+                    self.total.min_value,
+                    self.total.max_value,
+                    self.n_slots,
+                ]
+            ),
+            total=self.total.counts,
+            slot_ids=self.slot_ids,
+            slots=self.slots,
+        )
+        return buffer.getvalue()
+
+    @classmethod
+    def from_bytes(cls, payload: bytes) -> WindowedSketch:
+        with np.load(io.BytesIO(payload)) as data:
+            slot_s, accuracy, lo, hi, n_slots = data["params"]
+            sketch = cls(
+                slot_s=float(slot_s),
+                horizon_s=float(slot_s * n_slots),
+                relative_accuracy=float(accuracy),
+                min_value=float(lo),
+                max_value=float(hi),
+            )
+            sketch.total.counts = data["total"]
+            sketch.slot_ids = data["slot_ids"]
+            sketch.slots = data["slots"]
+            sketch.n_slots = len(sketch.slot_ids)
+        return sketch
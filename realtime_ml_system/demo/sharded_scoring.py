@@ -0,0 +1,231 @@
+"""Multi-process scoring with events sharded by entity hash.
+
+Every worker process owns one shard of the entity space: its slice of the
+batch feature store, its own :class:`WindowAggregator` state and its own
+metrics.  The parent routes each event to ``shard_of(entity_id)``.  Chunks
+for a worker travel over one FIFO queue and are scored in arrival order, so
+the events of any single entity are processed in stream order.  No state is
+shared between workers.
+
+Workers record latency in a :class:`LogBucketSketch`, which merges by
+adding counters, so :meth:`ShardedScorer.metrics` combines the shards into
+one view with the same 1% accuracy as a single sketch.
+
+Scaling benchmark on the ``stream_events`` workload:
+    python realtime_ml_system/demo/sharded_scoring.py --events 200000 --workers 1 2 4 8
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import multiprocessing as mp
+import os
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from feature_store import FeatureStore
+from latency_sketch import LogBucketSketch
+from window_aggregator import WindowAggregator
+
+
+def shard_of(entity_ids, n_shards: int) -> np.ndarray:
+    """Shard index per entity id (Fibonacci hashing, stable across processes)."""
+    ids = np.asarray(entity_ids, dtype=np.int64).astype(np.uint64)
+    mixed = (ids * np.uint64(0x9E3779B97F4A7C15)) >> np.uint64(32)
+    return (mixed % np.uint64(n_shards)).astype(np.int64)
+
+
+class ShardMetrics:
+    """Per-worker stand-in for ``MetricsLogger``: mergeable, in memory."""
+
+    def __init__(self):
+        self.latency = LogBucketSketch()
+        self.events = 0
+        self.prob_sum = 0.0
+
+    def log_inference(self, latency_ms: float, prediction: float, label: int):
+        self.latency.add(latency_ms)
+        self.events += 1
+        self.prob_sum += prediction
+
+
+def _worker(shard: int, model, store_ids, store_values, columns, aggregate, inbox, outbox):
+    from online_inference import ScoringApp
+
+    metrics = ShardMetrics()
+    app = ScoringApp(
+        model,
+        FeatureStore(store_ids, store_values, columns),
+        metrics,
+        aggregator=WindowAggregator() if aggregate else None,
+    )
+    while (message := inbox.get()) is not None:
+        kind = message[0]
+        if kind == "score":
+            _, seq, events, collect = message
+            probs = app.score_batch(events)
+            if collect:
+                outbox.put(("probs", seq, probs))
+        elif kind == "sync":
+            outbox.put(("sync", shard))
+        elif kind == "metrics":
+            outbox.put(("metrics", shard, metrics.latency.counts, metrics.events, metrics.prob_sum))
+
+
+class ShardedScorer:
+    """Route events to ``n_workers`` scoring processes by entity hash.
+
+    Parameters
+    ----------
+    model : fitted ``LGBMClassifier``
+    feature_store : FeatureStore — split into one slice per worker
+    n_workers : int
+    aggregate : bool — give each worker a :class:`WindowAggregator`
+    chunk_size : int — events per message to a worker
+    max_pending : int — chunks queued per worker before routing blocks
+    """
+
+    def __init__(
+        self,
+        model,
+        feature_store: FeatureStore,
+        n_workers: int = os.cpu_count() or 1,
+        aggregate: bool = False,
+        chunk_size: int = 2048,
+        max_pending: int = 8,
+    ):
+        if aggregate and not getattr(model, "window_features_", False):
+            raise ValueError("aggregate=True needs a model from batch_train(window_features=True)")
+        self.n_workers = n_workers
+        self.chunk_size = chunk_size
+        ctx = mp.get_context("fork" if "fork" in mp.get_all_start_methods() else "spawn")
+        self._outbox = ctx.Queue()
+        self._inboxes = [ctx.Queue(max_pending) for _ in range(n_workers)]
+        ids, values = feature_store.snapshot()
+        owner = shard_of(ids, n_workers)
+        self._procs = []
+        for shard in range(n_workers):
+            mine = owner == shard
+            proc = ctx.Process(
+                target=_worker,
+                args=(
+                    shard,
+                    model,
+                    np.ascontiguousarray(ids[mine]),
+                    np.ascontiguousarray(values[mine]),
+                    feature_store.columns,
+                    aggregate,
+                    self._inboxes[shard],
+                    self._outbox,
+                ),
+                daemon=True,
+            )
+            proc.start()
+            self._procs.append(proc)
+        self._seq = 0
+
+    def score(self, events: list[dict], collect: bool = False) -> np.ndarray | None:
+        """Score ``events`` across the workers; block until all are done.
+
+        With ``collect=True`` the probabilities come back in input order.
+        """
+        pending = {}
+        for start in range(0, len(events), self.chunk_size * self.n_workers):
+            block = events[start : start + self.chunk_size * self.n_workers]
+            ids = np.fromiter((e["entity_id"] for e in block), dtype=np.int64, count=len(block))
+            shards = shard_of(ids, self.n_workers)
+            order = np.argsort(shards, kind="stable")  # stable: keeps per-entity order
+            bounds = np.searchsorted(shards[order], np.arange(self.n_workers + 1))
+            for shard in range(self.n_workers):
+                idx = order[bounds[shard] : bounds[shard + 1]]
+                if len(idx) == 0:
+                    continue
+                self._seq += 1
+                if collect:
+                    pending[self._seq] = idx + start
+                self._inboxes[shard].put(("score", self._seq, [block[i] for i in idx], collect))
+
+        probs = np.empty(len(events)) if collect else None
+        for inbox in self._inboxes:
+            inbox.put(("sync",))
+        synced = 0
+        while synced < self.n_workers or (collect and pending):
+            message = self._outbox.get()
+            if message[0] == "sync":
+                synced += 1
+            elif message[0] == "probs":
+                probs[pending.pop(message[1])] = message[2]
+        return probs
+
+    def metrics(self) -> dict:
+        """Merged view over all workers (latency percentiles from merged sketches)."""
+        for inbox in self._inboxes:
+            inbox.put(("metrics",))
+        merged, per_worker, prob_sum = LogBucketSketch(), [0] * self.n_workers, 0.0
+        for _ in range(self.n_workers):
+            _, shard, counts, events, shard_prob_sum = self._outbox.get()
+            merged.counts += counts
+            per_worker[shard] = events
+            prob_sum += shard_prob_sum
+        total = sum(per_worker)
+        p50, p95, p99 = merged.quantiles([0.50, 0.95, 0.99])
+        return {
+            "events": total,
+            "events_per_worker": per_worker,
+            "mean_prediction": prob_sum / total if total else None,
+            "latency_ms": {"p50": float(p50), "p95": float(p95), "p99": float(p99)},
+        }
+
+    def close(self) -> None:
+        for inbox in self._inboxes:
+            inbox.put(None)
+        for proc in self._procs:
+            proc.join()
+
+    def __enter__(self) -> ShardedScorer:
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def benchmark(n_events: int = 200_000, workers=(1, 2, 4), aggregate: bool = True) -> list[dict]:
+    """Events/sec for each worker count on the same ``stream_events`` workload."""
+    from online_inference import batch_train
+    from stream_simulator import generate_feature_store, stream_events
+
+    model = batch_train(window_features=aggregate)
+    store = FeatureStore.from_dict(generate_feature_store())
+    events = list(stream_events(n_events=n_events))
+    results = []
+    for n in workers:
+        with ShardedScorer(model, store, n_workers=n, aggregate=aggregate) as scorer:
+            scorer.score(list(stream_events(n_events=5_000, seed=7)))  # warm up every worker
+            t0 = time.perf_counter()
+            scorer.score(events)
+            elapsed = time.perf_counter() - t0
+        rate = n_events / elapsed
+        results.append(
+            {
+                "workers": n,
+                "cpus": os.cpu_count(),
+                "events_per_s": round(rate),
+                "speedup": round(rate / results[0]["events_per_s"], 2) if results else 1.0,
+            }
+        )
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sharded scoring scaling benchmark")
+    parser.add_argument("--events", type=int, default=200_000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--no-aggregate", action="store_true", help="batch-store features only")
+    args = parser.parse_args()
+    print(json.dumps(benchmark(args.events, args.workers, not args.no_aggregate), indent=2))
@@ -0,0 +1,295 @@
+"""Asyncio consumer pipeline for :class:`online_inference.ScoringApp`.
+
+Events flow through independent stages joined by bounded queues::
+
+    source ──▶ [events] ──▶ assemble ──▶ [rows] ──▶ infer × N ──▶ [results] ──▶ sink
+
+- **source**: any async iterator of event dicts — :func:`iter_source` (an
+  in-process generator), :func:`jsonl_source` (a local file) or
+  :func:`socket_source` (newline-delimited JSON over TCP, standing in for a
+  Kafka consumer; :func:`start_event_server` is a matching producer).
+- **assemble**: one task, so streaming window state is updated in event
+  order.  The app's drift monitor, if it has one, is fed from here too, in
+  runs of up to ``max_batch`` rows, so its time slots see event order.
+- **infer**: ``inference_workers`` tasks, each coalescing up to ``max_batch``
+  rows (waiting at most ``max_wait_ms``) into one booster call in a thread
+  pool.  LightGBM releases the GIL, so workers overlap with each other and
+  with the other stages; batches can finish out of order.
+- **sink**: logs each event's end-to-end latency (source → scored).
+
+A full queue blocks the stage feeding it, so a slow stage throttles the
+source instead of buffering without bound.  :meth:`StreamPipeline.stats`
+reports per-stage throughput, busy fraction (summed over a stage's workers)
+and queue depths; a stage whose busy fraction approaches its worker count
+(normally ``infer``) is the bottleneck.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import time
+from collections.abc import AsyncIterator, Iterable
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+_END = object()  # end-of-stream marker passed down the queues
+
+
+# ── Sources ──────────────────────────────────────────────────────────
+
+
+async def iter_source(events: Iterable[dict], yield_every: int = 256) -> AsyncIterator[dict]:
+    """Wrap a synchronous generator, yielding to the loop every ``yield_every`` events."""
+    for i, event in enumerate(events):
+        yield event
+        if i % yield_every == yield_every - 1:
+            await asyncio.sleep(0)
+
+
+async def jsonl_source(path: str | Path, chunk_lines: int = 1024) -> AsyncIterator[dict]:
+    """Events from a JSON-lines file, read in chunks off the event loop."""
+    loop = asyncio.get_running_loop()
+    with open(path) as f:
+        while True:
+            lines = await loop.run_in_executor(None, _read_lines, f, chunk_lines)
+            if not lines:
+                return
+            for line in lines:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def _read_lines(f, n: int) -> list[str]:
+    lines = []
+    for line in f:
+        lines.append(line)
+        if len(lines) == n:
+            break
+    return lines
+
+
+async def queue_source(queue: asyncio.Queue) -> AsyncIterator[dict]:
+    """Events put on an asyncio queue by another task, until it puts ``None``."""
+    while (event := await queue.get()) is not None:
+        yield event
+
+
+async def socket_source(host: str, port: int) -> AsyncIterator[dict]:
+    """Newline-delimited JSON events read from a TCP producer until it closes."""
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while line := await reader.readline():
+            yield json.loads(line)
+    finally:
+        writer.close()
+        await writer.wait_closed()
+
+
+async def start_event_server(
+    events: Iterable[dict], host: str = "127.0.0.1", port: int = 0
+) -> asyncio.AbstractServer:
+    """Serve ``events`` as JSON lines to the first client, then close the connection."""
+    remaining = iter(events)
+
+    async def handle(reader, writer):
+        for event in remaining:
+            writer.write(json.dumps(event, default=_json_default).encode() + b"\n")
+            if writer.transport.get_write_buffer_size() > 1 << 16:
+                await writer.drain()
+        await writer.drain()
+        writer.close()
+
+    return await asyncio.start_server(handle, host, port)
+
+
+def _json_default(obj):
+    if isinstance(obj, np.generic):
+        return obj.item()
+    raise TypeError(f"{type(obj).__name__} is not JSON serializable")
+
+
+# ── Pipeline ─────────────────────────────────────────────────────────
+
+
+class _StageStats:
+    def __init__(self, name: str, inbox: asyncio.Queue | None):
+        self.name = name
+        self.inbox = inbox
+        self.items = 0
+        self.busy_s = 0.0
+        self.max_depth = 0
+
+    def observe_depth(self) -> None:
+        if self.inbox is not None:
+            self.max_depth = max(self.max_depth, self.inbox.qsize())
+
+    def snapshot(self, elapsed_s: float) -> dict:
+        elapsed_s = max(elapsed_s, 1e-9)
+        return {
+            "items": self.items,
+            "throughput_per_s": round(self.items / elapsed_s, 1),
+            "busy_fraction": round(self.busy_s / elapsed_s, 4),
+            "queue_depth": self.inbox.qsize() if self.inbox is not None else None,
+            "max_queue_depth": self.max_depth if self.inbox is not None else None,
+        }
+
+
+class StreamPipeline:
+    """Run events from a source through ``app``'s assemble → infer → log stages.
+
+    Parameters
+    ----------
+    app : ScoringApp — supplies ``assemble``, ``booster``, ``logger`` and
+        ``drift_monitor`` / ``monitor_drift``
+    max_batch : int — rows per inference call
+    max_wait_ms : float — how long an inference worker waits to fill a batch
+    queue_size : int — capacity of each inter-stage queue
+    inference_workers : int — concurrent inference calls (thread-pool size)
+    """
+
+    def __init__(
+        self,
+        app,
+        max_batch: int = 64,
+        max_wait_ms: float = 2.0,
+        queue_size: int = 1024,
+        inference_workers: int = 2,
+    ):
+        self.app = app
+        self.max_batch = max_batch
+        self.max_wait_s = max_wait_ms / 1000
+        self.queue_size = queue_size
+        self.inference_workers = inference_workers
+        self._stages: dict[str, _StageStats] = {}
+        self._started = self._finished = None
+
+    async def run(self, source: AsyncIterator[dict]) -> dict:
+        """Consume ``source`` to the end and return :meth:`stats`."""
+        events = asyncio.Queue(self.queue_size)
+        rows = asyncio.Queue(self.queue_size)
+        results = asyncio.Queue(self.queue_size)
+        self._stages = {
+            "source": _StageStats("source", None),
+            "assemble": _StageStats("assemble", events),
+            "infer": _StageStats("infer", rows),
+            "sink": _StageStats("sink", results),
+        }
+        self._started, self._finished = time.perf_counter(), None
+        pool = ThreadPoolExecutor(self.inference_workers, thread_name_prefix="infer")
+        tasks = [
+            asyncio.create_task(self._feed(source, events)),
+            asyncio.create_task(self._assemble(events, rows)),
+            asyncio.create_task(self._infer_all(rows, results, pool)),
+            asyncio.create_task(self._sink(results)),
+        ]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+        finally:
+            pool.shutdown(wait=False)
+            self._finished = time.perf_counter()
+        return self.stats()
+
+    def stats(self) -> dict:
+        if self._started is None:
+            return {}
+        elapsed = (self._finished or time.perf_counter()) - self._started
+        return {
+            "elapsed_s": round(elapsed, 4),
+            "events_per_s": round(self._stages["sink"].items / max(elapsed, 1e-9), 1),
+            "stages": {name: s.snapshot(elapsed) for name, s in self._stages.items()},
+        }
+
+    # ── stages ───────────────────────────────────────────────────────
+
+    async def _feed(self, source: AsyncIterator[dict], events: asyncio.Queue) -> None:
+        stage = self._stages["source"]
+        async for event in source:
+            await events.put((event, time.perf_counter()))
+            stage.items += 1
+            self._stages["assemble"].observe_depth()
+        await events.put(_END)
+
+    async def _assemble(self, events: asyncio.Queue, rows: asyncio.Queue) -> None:
+        stage = self._stages["assemble"]
+        monitored = self.app.drift_monitor is not None
+        drift_rows = []  # (row, event time), in event order
+        while (item := await events.get()) is not _END:
+            event, t_in = item
+            t0 = time.perf_counter()
+            x = self.app.assemble(event)
+            if monitored:
+                drift_rows.append((x, event.get("timestamp")))
+                if len(drift_rows) >= self.max_batch:
+                    self._monitor_drift(drift_rows)
+            stage.busy_s += time.perf_counter() - t0
+            stage.items += 1
+            await rows.put((event, t_in, x))
+            self._stages["infer"].observe_depth()
+        self._monitor_drift(drift_rows)
+        for _ in range(self.inference_workers):
+            await rows.put(_END)
+
+    def _monitor_drift(self, drift_rows: list) -> None:
+        if drift_rows:
+            x = np.stack([row for row, _ in drift_rows])
+            self.app.monitor_drift(x, [ts for _, ts in drift_rows])
+            drift_rows.clear()
+
+    async def _infer_all(self, rows, results, pool) -> None:
+        await asyncio.gather(
+            *(self._infer(rows, results, pool) for _ in range(self.inference_workers))
+        )
+        await results.put(_END)
+
+    async def _infer(self, rows: asyncio.Queue, results: asyncio.Queue, pool) -> None:
+        loop = asyncio.get_running_loop()
+        stage = self._stages["infer"]
+        done = False
+        while not done:
+            item = await rows.get()
+            if item is _END:
+                return
+            batch = [item]
+            deadline = loop.time() + self.max_wait_s
+            while len(batch) < self.max_batch:
+                try:
+                    item = rows.get_nowait()
+                except asyncio.QueueEmpty:
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        break
+                    try:
+                        item = await asyncio.wait_for(rows.get(), remaining)
+                    except asyncio.TimeoutError:
+                        break
+                if item is _END:
+                    done = True
+                    break
+                batch.append(item)
+
+            x = np.stack([row[2] for row in batch])
+            t0 = time.perf_counter()
+            probs = await loop.run_in_executor(pool, self.app.booster.predict, x)
+            t_done = time.perf_counter()
+            stage.busy_s += t_done - t0
+            stage.items += len(batch)
+            await results.put((batch, probs, t_done))
+            self._stages["sink"].observe_depth()
+
+    async def _sink(self, results: asyncio.Queue) -> None:
+        stage = self._stages["sink"]
+        log = self.app.logger.log_inference
+        while (item := await results.get()) is not _END:
+            batch, probs, t_done = item
+            t0 = time.perf_counter()
+            for (event, t_in, _), prob in zip(batch, probs.tolist()):
+                log((t_done - t_in) * 1000, prob, event.get("_label", -1))
+            stage.busy_s += time.perf_counter() - t0
+            stage.items += len(batch)
@@ -30,13 +30,27 @@ def generate_feature_store(n_entities: int = 500, seed: int = 42) -> dict[str, d
     return store
 
 
-def stream_events(n_events: int = 1000, fraud_rate: float = 0.05, seed: int = 42):
+def stream_events(
+    n_events: int = 1000,
+    fraud_rate: float = 0.05,
+    seed: int = 42,
+    start_ts: float = 1_700_000_000.0,
+    mean_gap_s: float = 30.0,
+    n_merchants: int = 5000,
+):
     """Yield transaction events one at a time, simulating a stream.
 
     Each event contains real-time features (from the event payload) and
-    an entity_id for feature store lookup.
+    an entity_id for feature store lookup, plus an event ``timestamp``
+    (Poisson arrivals, ``mean_gap_s`` apart on average) and a ``merchant_id``
+    for the streaming window aggregates.  Legitimate customers mostly shop
+    at a dozen "home" merchants; fraud hits arbitrary ones.
     """
     rng = np.random.RandomState(seed)
+    # Timestamps / merchants come from their own generator so the original
+    # event fields stay identical for a given seed.
+    aux = np.random.RandomState(seed + 1)
+    ts = start_ts
 
     for i in range(n_events):
         is_fraud = rng.random() < fraud_rate
@@ -44,6 +58,11 @@ def stream_events(n_events: int = 1000, fraud_rate: float = 0.05, seed: int = 42
 
         # Real-time features (extracted from event payload)
         amount = rng.lognormal(6.5, 0.8) if is_fraud else rng.lognormal(4.5, 1.0)
+        ts += aux.exponential(mean_gap_s)
+        if is_fraud:
+            merchant_id = int(aux.randint(n_merchants))
+        else:
+            merchant_id = int((entity_id * 7919 + aux.randint(12)) % n_merchants)
         event = {
             "event_id": i,
             "entity_id": entity_id,
@@ -51,6 +70,8 @@ def stream_events(n_events: int = 1000, fraud_rate: float = 0.05, seed: int = 42
             "hour_of_day": int(rng.choice(24)),
             "device_type": rng.choice(["mobile", "desktop", "tablet"]),
             "is_international": int(rng.random() < (0.3 if is_fraud else 0.05)),
+            "timestamp": round(ts, 3),
+            "merchant_id": merchant_id,
             # Ground truth (not available at inference time — used for evaluation only)
             "_label": int(is_fraud),
         }
@@ -0,0 +1,160 @@
+"""Per-entity sliding-window aggregates computed from the event stream.
+
+The batch store's ``velocity_1h``, ``txn_count_7d``, ``avg_daily_spend_30d``
+and ``distinct_merchants_30d`` are up to six hours stale.  This engine keeps
+their state online instead, per entity, in fixed-size rings of time buckets:
+
+================================  ==========================================
+velocity_1h                       count, 60 × 1-minute buckets
+txn_count_7d                      count, 168 × 1-hour buckets
+avg_daily_spend_30d               amount sum, 30 × 1-day buckets, / 30
+distinct_merchants_30d            HyperLogLog registers, 30 × 1-day buckets
+================================  ==========================================
+
+A window ends at the newest event seen for the entity and slides one bucket
+at a time.  An update touches one bucket per ring, plus the buckets that
+expired since the entity's previous event (amortised O(1)).  Memory is fixed
+per entity (about 3 kB with the default 64 HyperLogLog registers), however
+many events arrive.
+"""
+
+from __future__ import annotations
+
+import math
+
+import numpy as np
+
+# Output order of :meth:`WindowAggregator.update`
+AGG_COLS = ["velocity_1h", "txn_count_7d", "avg_daily_spend_30d", "distinct_merchants_30d"]
+
+_MASK64 = (1 << 64) - 1
+
+
+def _hash64(value: int) -> int:
+    """splitmix64 finaliser — a cheap, well-mixed 64-bit hash of an int id."""
+    z = (value + 0x9E3779B97F4A7C15) & _MASK64
+    z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & _MASK64
+    z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & _MASK64
+    return z ^ (z >> 31)
+
+
+def hll_estimate(registers: np.ndarray) -> float:
+    """HyperLogLog cardinality estimate, with linear counting for small sets."""
+    m = registers.shape[-1]
+    alpha = {16: 0.673, 32: 0.697, 64: 0.709}.get(m, 0.7213 / (1 + 1.079 / m))
+    estimate = alpha * m * m / float(np.ldexp(1.0, -registers.astype(np.int64)).sum())
+    zeros = int((registers == 0).sum())
+    if estimate <= 2.5 * m and zeros:
+        return m * math.log(m / zeros)
+    return estimate
+
+
+class _Ring:
+    """``n_buckets`` time buckets of width ``bucket_s`` for every entity slot."""
+
+    def __init__(self, n_buckets: int, bucket_s: float, capacity: int, shape=(), dtype=np.int32):
+        self.n_buckets = n_buckets
+        self.bucket_s = bucket_s
+        self.values = np.zeros((capacity, n_buckets, *shape), dtype=dtype)
+        self.last = np.full(capacity, -1, dtype=np.int64)  # newest bucket number per slot
+
+    def grow(self, capacity: int) -> None:
+        extra = capacity - len(self.last)
+        self.values = np.concatenate(
+            [self.values, np.zeros((extra, *self.values.shape[1:]), self.values.dtype)]
+        )
+        self.last = np.concatenate([self.last, np.full(extra, -1, dtype=np.int64)])
+
+    def position(self, slot: int, ts: float) -> int | None:
+        """Ring position for an event at ``ts``, expiring buckets the window slid past.
+
+        Returns None for a late event older than the whole window.
+        """
+        bucket = int(ts // self.bucket_s)
+        last = int(self.last[slot])
+        if bucket > last:
+            if last < 0 or bucket - last >= self.n_buckets:
+                self.values[slot] = 0
+            else:
+                for b in range(last + 1, bucket + 1):
+                    self.values[slot, b % self.n_buckets] = 0
+            self.last[slot] = bucket
+        elif bucket <= last - self.n_buckets:
+            return None
+        return bucket % self.n_buckets
+
+
+class WindowAggregator:
+    """Online per-entity window state; ``update(event)`` returns the fresh aggregates.
+
+    Events need ``entity_id``, ``timestamp`` (epoch seconds),
+    ``transaction_amount`` and, for the distinct count, ``merchant_id``.
+
+    Parameters
+    ----------
+    hll_precision : int — HyperLogLog uses ``2**hll_precision`` registers per day
+    capacity : int — initial number of entity slots (grows by doubling)
+    """
+
+    def __init__(self, hll_precision: int = 6, capacity: int = 1024):
+        self.hll_precision = hll_precision
+        self._hll_m = 1 << hll_precision
+        self._slots: dict = {}
+        self._capacity = capacity
+        self._minute = _Ring(60, 60.0, capacity)
+        self._hour = _Ring(168, 3600.0, capacity)
+        self._day_spend = _Ring(30, 86400.0, capacity, dtype=np.float64)
+        self._day_hll = _Ring(30, 86400.0, capacity, shape=(self._hll_m,), dtype=np.uint8)
+        self._rings = (self._minute, self._hour, self._day_spend, self._day_hll)
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def _slot(self, entity_id) -> int:
+        slot = self._slots.get(entity_id)
+        if slot is None:
+            slot = self._slots[entity_id] = len(self._slots)
+            if slot >= self._capacity:
+                self._capacity *= 2
+                for ring in self._rings:
+                    ring.grow(self._capacity)
+        return slot
+
+    def update(self, event: dict) -> np.ndarray:
+        """Add ``event`` to its entity's windows, then return :data:`AGG_COLS` (float32)."""
+        slot = self._slot(event["entity_id"])
+        ts = event["timestamp"]
+        for ring in (self._minute, self._hour):
+            pos = ring.position(slot, ts)
+            if pos is not None:
+                ring.values[slot, pos] += 1
+        pos = self._day_spend.position(slot, ts)
+        if pos is not None:
+            self._day_spend.values[slot, pos] += event.get("transaction_amount", 0.0)
+        pos = self._day_hll.position(slot, ts)
+        merchant = event.get("merchant_id")
+        if pos is not None and merchant is not None:
+            h = _hash64(int(merchant))
+            p = self.hll_precision
+            register = h >> (64 - p)
+            rank = (64 - p) - (h & ((1 << (64 - p)) - 1)).bit_length() + 1
+            registers = self._day_hll.values[slot, pos]
+            if rank > registers[register]:
+                registers[register] = rank
+        return self.read(event["entity_id"])
+
+    def read(self, entity_id) -> np.ndarray:
+        """Current aggregates for an entity (zeros if it has never been seen)."""
+        slot = self._slots.get(entity_id)
+        if slot is None:
+            return np.zeros(len(AGG_COLS), dtype=np.float32)
+        registers = self._day_hll.values[slot].max(axis=0)
+        return np.array(
+            [
+                self._minute.values[slot].sum(),
+                self._hour.values[slot].sum(),
+                self._day_spend.values[slot].sum() / self._day_spend.n_buckets,
+                round(hll_estimate(registers)) if registers.any() else 0.0,
+            ],
+            dtype=np.float32,
+        )
@@ -5,6 +5,11 @@ Tests cover:
 - expected_calibration_error
 - brier_score
 - ClassificationEvaluator summary output
+- Matrix drift engine (parity with psi / ks_drift_test)
+- ReferenceProfile (save/load, drift_report without reference data)
+- DriftAccumulator (chunked + merged windows match drift_report)
+- DriftMonitor (sliding-window PSI ticks, per-event and batched)
+- Categorical drift (top-K + hashed buckets, PSI / chi-square / Jensen–Shannon)
 """
 
 import sys
@@ -12,12 +17,25 @@ from pathlib import Path
 
 import numpy as np
 import pandas as pd
+import pytest
 
 # Ensure ds_tools is importable from repo root
 sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "ds_tools" / "src"))
 
 from ds_tools.evaluation.calibration import brier_score, expected_calibration_error
 from ds_tools.evaluation.report import ClassificationEvaluator
+from ds_tools.monitoring import (
+    CategoricalBinner,
+    DriftAccumulator,
+    DriftMonitor,
+    ReferenceProfile,
+    categorical_drift_report,
+    categorical_drift_test,
+    drift_matrix,
+    drift_report,
+    ks_drift_test,
+    psi,
+)
 from ds_tools.preprocessing.transformers import FrequencyEncoder
 
 
@@ -80,3 +98,158 @@ def test_evaluator_summary_keys():
     expected_keys = {"ROC-AUC", "Average Precision", "Log Loss", "Brier Score", "ECE"}
     assert set(metrics.keys()) == expected_keys
     assert all(isinstance(v, float) for v in metrics.values())
+
+
+def test_drift_matrix_matches_per_feature_metrics():
+    """The vectorised engine reproduces psi / ks_drift_test, with ties and NaNs."""
+    rng = np.random.RandomState(0)
+    ref = rng.normal(size=(3000, 4))
+    cur = rng.normal(0.3, 1.2, size=(2000, 4))
+    ref[:, 1], cur[:, 1] = rng.randint(0, 4, 3000), rng.randint(0, 5, 2000)  # heavy ties
+    ref[rng.rand(3000, 4) < 0.05] = np.nan
+    cur[rng.rand(2000, 4) < 0.1] = np.nan
+
+    result = drift_matrix(ref, cur, block_size=3, n_jobs=2)
+    for j in range(4):
+        r, c = ref[~np.isnan(ref[:, j]), j], cur[~np.isnan(cur[:, j]), j]
+        ks = ks_drift_test(r, c)
+        assert np.isclose(result["psi"][j], psi(r, c))
+        assert np.isclose(result["ks_statistic"][j], ks["statistic"])
+        assert np.isclose(result["ks_p_value"][j], ks["p_value"])
+        assert np.isclose(result["cur_mean"][j], c.mean())
+        assert result["n_ref"][j] == len(r)
+
+    features = ["a", "b", "c", "d"]
+    ref_df, cur_df = pd.DataFrame(ref, columns=features), pd.DataFrame(cur, columns=features)
+    report = drift_report(ref_df, cur_df, features)
+    assert list(report.columns[:3]) == ["feature", "psi", "psi_alert"]
+    assert report["psi"].is_monotonic_decreasing and report["ks_drift"].all()
+
+
+def test_reference_profile_replaces_reference_data(tmp_path):
+    """A saved profile reproduces PSI exactly and KS within its ECDF compression."""
+    rng = np.random.RandomState(1)
+    features = ["amount", "count", "score"]
+    ref = pd.DataFrame(rng.normal(size=(20_000, 3)), columns=features)
+    ref["count"] = rng.poisson(5, 20_000)  # few distinct values → exact ECDF
+    cur = ref.sample(8_000, random_state=2).reset_index(drop=True) * 1.1
+    cur.loc[::7, "score"] = np.nan
+
+    profile = ReferenceProfile.fit(ref, max_knots=256)
+    path = profile.save(tmp_path / "profile.npz")
+    loaded = ReferenceProfile.load(path)
+    assert loaded.features == features and loaded.n_bins == 10
+    assert loaded.moments["n"].tolist() == [20_000] * 3
+
+    exact = drift_matrix(ref, cur)
+    approx = loaded.compare(cur)
+    np.testing.assert_allclose(approx["psi"], exact["psi"])
+    np.testing.assert_allclose(approx["ref_mean"], exact["ref_mean"])
+    assert approx["ks_statistic"][1] == exact["ks_statistic"][1]
+    assert np.abs(approx["ks_statistic"] - exact["ks_statistic"]).max() <= 1 / 255
+
+    report = drift_report(loaded, cur, ["score", "amount"])
+    assert sorted(report["feature"]) == ["amount", "score"]
+    assert report["psi"].tolist() == drift_report(ref, cur, ["score", "amount"])["psi"].tolist()
+    # The current window needs only the requested columns
+    only_amount = drift_report(loaded, cur[["amount"]], ["amount"])
+    assert only_amount["psi"].tolist() == report.set_index("feature").loc[["amount"], "psi"].tolist()
+
+
+def test_drift_accumulator_chunks_and_merges_to_drift_report(tmp_path):
+    """Chunked, merged accumulation reproduces the in-memory report."""
+    rng = np.random.RandomState(3)
+    features = ["amount", "count", "score"]
+    ref = pd.DataFrame(rng.normal(size=(4_000, 3)), columns=features)
+    ref["count"] = rng.poisson(4, 4_000)
+    cur = pd.DataFrame(rng.normal(0.2, 1.1, size=(15_000, 3)), columns=features)
+    cur["count"] = rng.poisson(5, 15_000)
+    cur.loc[::11, "score"] = np.nan
+
+    profile = ReferenceProfile.fit(ref, max_knots=8_192)  # keeps every distinct value
+    parts = [DriftAccumulator(profile) for _ in range(3)]
+    for i, chunk in enumerate(np.array_split(cur, 10)):
+        parts[i % 3].update(chunk)
+    merged = parts[0].merge(parts[1]).merge(parts[2])
+
+    expected = drift_report(ref, cur, features)
+    pd.testing.assert_frame_equal(merged.finalize(), expected)
+    np.testing.assert_allclose(np.sqrt(merged.m2 / merged.n), cur.std(ddof=0).to_numpy())
+    assert merged.n_missing.tolist() == [0, 0, cur["score"].isna().sum()]
+
+    cur.to_csv(tmp_path / "window.csv", index=False)
+    from_csv = DriftAccumulator(profile).update_csv(tmp_path / "window.csv", chunksize=4_000)
+    pd.testing.assert_frame_equal(from_csv.finalize(), expected)
+
+    with pytest.raises(ValueError, match="same profile"):
+        merged.merge(DriftAccumulator(ref, features=["amount"]))
+
+
+def test_drift_monitor_sliding_window_ticks():
+    """Per-event and batched updates tick alike; each tick scores only the last window."""
+    rng = np.random.RandomState(4)
+    ref = pd.DataFrame(rng.normal(size=(5_000, 2)), columns=["amount", "score"])
+    profile = ReferenceProfile.fit(ref)
+    stable = rng.normal(size=(3_000, 2))
+    shifted = rng.normal(1.0, 1.0, size=(2_000, 2))
+    cur = np.vstack([stable, shifted])
+
+    seen = []
+    single = DriftMonitor(profile, window_events=1_000, n_slots=4, on_tick=seen.append)
+    fired = [tick for row in cur if (tick := single.update(row)) is not None]
+    batched = DriftMonitor(profile, window_events=1_000, n_slots=4)
+    assert batched.update_batch(cur) == fired == seen
+    assert len(fired) == len(cur) // 250 and len(single.ticks) == len(fired)
+
+    # The tick after 3 000 events covers rows 2 000..2 999 only
+    tick = fired[11]
+    assert tick["events"] == 3_000 and tick["window_events"] == 1_000
+    window = pd.DataFrame(stable[2_000:], columns=["amount", "score"])
+    expected = drift_report(profile, window, ["amount", "score"]).set_index("feature")["psi"]
+    assert tick["psi"] == pytest.approx(expected.to_dict(), abs=1e-4)
+    assert tick["max_alert"] == "LOW" and fired[-1]["max_alert"] == "HIGH"
+
+    # Time-based window: a gap longer than the window empties it
+    timed = DriftMonitor(profile, features=["score"], window_s=60, n_slots=6)
+    for ts, value in enumerate(stable[:120, 1]):
+        timed.update([value], timestamp=1_000.0 + ts)
+    assert timed.n_ticks == 11 and timed.ticks[-1]["timestamp"] == 1_110.0
+    timed.update([0.0], timestamp=5_000.0)
+    assert timed.n_ticks == 12 and timed._window.sum() == 1
+    # Event time only: no falling back to the wall clock
+    with pytest.raises(ValueError, match="timestamp"):
+        timed.update([0.0])
+    with pytest.raises(ValueError, match="timestamp"):
+        timed.update_batch([[0.0], [1.0]], [5_001.0, None])
+    assert timed.events == 121
+
+
+def test_categorical_drift_hashed_buckets():
+    """Top-K + hashed buckets stay bounded and flag a new high-traffic category."""
+    rng = np.random.RandomState(5)
+    ref = pd.Series(rng.zipf(1.5, 50_000) % 100_000).astype(str)
+    stable = pd.Series(rng.zipf(1.5, 50_000) % 100_000).astype(str)
+    shifted = stable.copy()
+    shifted[:5_000] = "new_merchant"
+    shifted[5_000:5_500] = None
+
+    binner = CategoricalBinner(top_k=20, n_hash_buckets=8).fit(ref)
+    assert binner.n_buckets == 29 and binner.n_categories_ > 1_000
+    buckets = binner.transform(["new_merchant", None, binner.categories_[3]])
+    assert 20 <= buckets[0] < 28 and buckets[1] == 28 and buckets[2] == 3
+    chunks = np.array_split(shifted.to_numpy(), 4)
+    np.testing.assert_array_equal(sum(binner.counts(c) for c in chunks), binner.counts(shifted))
+
+    same = categorical_drift_test(ref, stable, top_k=20, n_hash_buckets=8)
+    drifted = categorical_drift_test(ref, shifted, top_k=20, n_hash_buckets=8)
+    assert same["psi"] < 0.01 and not same["is_drift"]
+    assert drifted["psi"] > 0.2 and drifted["is_drift"]
+    assert 0 < same["js_divergence"] < drifted["js_divergence"] <= 1
+
+    report = categorical_drift_report(
+        pd.DataFrame({"merchant_id": ref, "channel": ref}),
+        pd.DataFrame({"merchant_id": shifted, "channel": stable}),
+        ["channel", "merchant_id"],
+    )
+    assert report["feature"].tolist() == ["merchant_id", "channel"]
+    assert report["psi_alert"].tolist() == ["HIGH", "LOW"]
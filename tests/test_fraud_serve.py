@@ -0,0 +1,414 @@
+import gc
+import importlib
+import json
+import os
+import sys
+import weakref
+from pathlib import Path
+
+import joblib
+import lightgbm as lgb
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("httpx")
+from fastapi.testclient import TestClient
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "fraud_detection"))
+
+FEATURES = ["amount", "hour", "is_international"]
+
+
+@pytest.fixture(scope="module")
+def serve_app(tmp_path_factory):
+    """Import serve.app against a small artefact trained on the fly."""
+    rng = np.random.RandomState(0)
+    x = pd.DataFrame(
+        {
+            "amount": rng.lognormal(4.5, 1.0, 500),
+            "hour": rng.randint(0, 24, 500),
+            "is_international": rng.binomial(1, 0.1, 500),
+        }
+    )
+    y = (x["amount"] > 150).astype(int)
+    model = lgb.LGBMClassifier(n_estimators=20, verbose=-1).fit(x, y)
+
+    path = tmp_path_factory.mktemp("artefacts") / "fraud_model.joblib"
+    joblib.dump(
+        {
+            "model": model,
+            "feature_cols": FEATURES,
+            "numeric_cols": FEATURES,
+            "train_medians": x.median().to_dict(),
+            "threshold": 0.5,
+            "model_name": "LightGBM (test)",
+        },
+        path,
+    )
+    os.environ["FRAUD_ARTEFACT_PATH"] = str(path)
+    module = importlib.reload(importlib.import_module("serve.app"))
+    yield module
+    os.environ.pop("FRAUD_ARTEFACT_PATH", None)
+
+
+def test_batch_matches_single_row_predictions(serve_app):
+    """Each batch row should score exactly like the equivalent /predict call."""
+    client = TestClient(serve_app.app)
+    rows = [
+        {"amount": 20.0, "hour": 3, "is_international": 0},
+        {"amount": 900.0, "hour": 23},  # missing feature → imputed
+        {"amount": 150.0, "hour": 12, "is_international": 1},
+    ]
+
+    batch = client.post("/predict/batch", json={"features": rows}).json()
+    single = [client.post("/predict", json={"features": r}).json() for r in rows]
+
+    assert batch["n_rows"] == 3
+    for b, s in zip(batch["predictions"], single):
+        assert b["probability"] == pytest.approx(s["probability"], abs=1e-6)
+        assert b["is_fraud"] == s["is_fraud"]
+
+
+def test_batch_columnar_layout(serve_app):
+    """Columnar and row-oriented payloads should give identical scores."""
+    client = TestClient(serve_app.app)
+    columns = {"amount": [20.0, 900.0], "hour": [3, 23], "is_international": [0, None]}
+    rows = [{"amount": 20.0, "hour": 3, "is_international": 0}, {"amount": 900.0, "hour": 23}]
+
+    by_col = client.post("/predict/batch", json={"columns": columns}).json()
+    by_row = client.post("/predict/batch", json={"features": rows}).json()
+    assert by_col["predictions"] == by_row["predictions"]
+
+
+def test_batch_rejects_ambiguous_payload(serve_app):
+    """Exactly one of 'features' / 'columns' must be provided."""
+    client = TestClient(serve_app.app)
+    assert client.post("/predict/batch", json={}).status_code == 422
+    resp = client.post("/predict/batch", json={"columns": {"amount": [1.0], "hour": [1, 2]}})
+    assert resp.status_code == 422
+
+
+def test_batch_rejects_oversized_payload_before_building_it(serve_app, monkeypatch):
+    """Too many rows → 413, without assembling the feature matrix first."""
+    client = TestClient(serve_app.app)
+    monkeypatch.setattr(serve_app, "MAX_BATCH_ROWS", 2)
+
+    def no_alloc(*args, **kwargs):
+        raise AssertionError("oversized batch was materialised")
+
+    monkeypatch.setattr(serve_app.np, "full", no_alloc)
+    for payload in (
+        {"features": [{"amount": 1.0}] * 3},
+        {"columns": {"amount": [1.0, 2.0, 3.0]}},
+    ):
+        resp = client.post("/predict/batch", json=payload)
+        assert resp.status_code == 413
+
+
+def test_micro_batcher_coalesces_concurrent_rows():
+    """Concurrent submits should share predict calls and get their own row's score."""
+    import asyncio
+
+    from serve.micro_batcher import MicroBatcher
+
+    calls = []
+
+    def predict_fn(x):
+        calls.append(len(x))
+        return x[:, 0] * 2
+
+    async def main():
+        batcher = MicroBatcher(predict_fn, max_batch_size=4, max_wait_ms=50)
+        scores = await asyncio.gather(*(batcher.submit(np.array([float(i)])) for i in range(10)))
+        await batcher.close()
+        return scores, batcher.stats()
+
+    scores, stats = asyncio.run(main())
+    assert scores == [2.0 * i for i in range(10)]
+    assert calls == [4, 4, 2]
+    assert stats["batch_size"]["count"] == 3
+    assert stats["queue_wait_ms"]["count"] == 10
+
+
+def test_micro_batcher_flushes_on_max_wait():
+    """A lone request should be flushed after max_wait, not held for a full batch."""
+    import asyncio
+    import time
+
+    from serve.micro_batcher import MicroBatcher
+
+    async def main():
+        batcher = MicroBatcher(lambda x: x[:, 0], max_batch_size=64, max_wait_ms=5)
+        t0 = time.perf_counter()
+        score = await batcher.submit(np.array([0.25]))
+        return score, time.perf_counter() - t0
+
+    score, elapsed = asyncio.run(main())
+    assert score == 0.25
+    assert elapsed < 1.0
+
+
+def test_compiled_tree_engine_matches_lightgbm():
+    """The flat-array engine should reproduce predict_proba, including NaN routing."""
+    from serve.tree_engine import CompiledTreeEnsemble
+
+    rng = np.random.RandomState(1)
+    x = rng.normal(size=(400, 4))
+    x[rng.rand(400) < 0.2, 1] = np.nan
+    y = (x[:, 0] + np.nan_to_num(x[:, 1]) > 0).astype(int)
+    model = lgb.LGBMClassifier(n_estimators=30, num_leaves=15, verbose=-1).fit(x, y)
+
+    engine = CompiledTreeEnsemble.from_lgbm(model)
+    x_test = rng.normal(size=(200, 4))
+    x_test[::7, 1] = np.nan
+    x_test[::11, 2] = 0.0
+
+    np.testing.assert_allclose(engine.predict_proba(x_test), model.predict_proba(x_test), atol=1e-9)
+    np.testing.assert_allclose(
+        engine.predict_proba(x_test[0]), model.predict_proba(x_test[:1]), atol=1e-9
+    )
+
+
+def test_positional_payloads_match_feature_dict(serve_app):
+    """'values' and 'values_b64' should score like the equivalent feature dict."""
+    import base64
+
+    client = TestClient(serve_app.app)
+    assert client.get("/health").json()["feature_cols"] == FEATURES
+
+    by_dict = client.post("/predict", json={"features": {"amount": 900.0, "hour": 23}}).json()
+    by_list = client.post("/predict", json={"values": [900.0, 23, None]}).json()
+    buffer = np.array([900.0, 23, np.nan], dtype="<f4").tobytes()
+    by_b64 = client.post(
+        "/predict", json={"values_b64": base64.b64encode(buffer).decode()}
+    ).json()
+
+    assert by_list["probability"] == by_dict["probability"]
+    assert by_b64["probability"] == by_dict["probability"]
+
+
+def test_positional_payload_validation(serve_app):
+    """Wrong lengths, bad base64 and ambiguous payloads are rejected with 422."""
+    client = TestClient(serve_app.app)
+    assert client.post("/predict", json={"values": [1.0, 2.0]}).status_code == 422
+    assert client.post("/predict", json={"values_b64": "not base64!"}).status_code == 422
+    assert client.post("/predict", json={}).status_code == 422
+    both = {"features": {"amount": 1.0}, "values": [1.0, 2.0, 3.0]}
+    assert client.post("/predict", json=both).status_code == 422
+
+
+def test_metrics_endpoint_exposes_stage_histograms(serve_app):
+    """/metrics should count requests and time every stage in Prometheus format."""
+    client = TestClient(serve_app.app)
+    before = serve_app.REQUESTS["/predict"].value
+    client.post("/predict", json={"features": {"amount": 20.0, "hour": 3}})
+
+    text = client.get("/metrics").text
+    assert serve_app.REQUESTS["/predict"].value == before + 1
+    assert "# TYPE fraud_stage_latency_ms histogram" in text
+    for stage in ("parse", "impute", "inference", "serialize"):
+        assert f'fraud_stage_latency_ms_count{{endpoint="/predict",stage="{stage}"}}' in text
+    assert 'fraud_requests_total{endpoint="/predict"}' in text
+
+
+def test_histogram_shards_merge_across_threads():
+    """Per-thread shards must add up to every observation made."""
+    from concurrent.futures import ThreadPoolExecutor
+
+    from serve.metrics import Counter, Histogram
+
+    hist = Histogram("h", (1.0, 10.0))
+    counter = Counter("c")
+
+    def work(_):
+        for v in (0.5, 5.0, 50.0):
+            hist.observe(v)
+            counter.inc()
+
+    with ThreadPoolExecutor(8) as pool:
+        list(pool.map(work, range(100)))
+
+    snap = hist.snapshot()
+    assert snap["buckets"] == {"1.0": 100, "10.0": 200, "+Inf": 300}
+    assert snap["count"] == 300
+    assert counter.value == 300
+
+
+def test_result_cache_skips_inference_and_invalidates_on_swap(serve_app, monkeypatch):
+    """Repeated /predict payloads hit the cache until the model is swapped."""
+    from serve.result_cache import ResultCache
+
+    cache = ResultCache(maxsize=2, ttl_s=60)
+    monkeypatch.setattr(serve_app, "CACHE", cache)
+    client = TestClient(serve_app.app)
+    payload = {"features": {"amount": 420.0, "hour": 2, "is_international": 1}}
+
+    first = client.post("/predict", json=payload).json()
+    second = client.post("/predict", json=payload).json()
+    assert second["probability"] == first["probability"]
+    assert (cache.hits.value, cache.misses.value) == (1, 1)
+
+    serve_app._swap_bundle(serve_app.BUNDLE)
+    assert len(cache) == 0
+
+    row = np.zeros(3, dtype=np.float32)
+    for version in (1, 2, 3):  # same row, different model → distinct keys
+        cache.put(cache.key(version, row), 0.5)
+    assert cache.get(cache.key(1, row)) is None  # least recently used, evicted
+    assert cache.get(cache.key(3, row)) == 0.5
+    assert cache.evictions.value == 1
+    assert client.get("/stats/cache").json()["size"] == 2
+
+
+def _register(registry, version, model, **metadata):
+    version_dir = registry / f"v{version}"
+    version_dir.mkdir(parents=True)
+    joblib.dump(model, version_dir / "model.joblib")
+    (version_dir / "metadata.json").write_text(
+        json.dumps({"version": version, "model_name": f"m{version}", **metadata})
+    )
+
+
+def test_registry_watcher_swaps_newer_versions(tmp_path):
+    """New complete versions are loaded, warmed and handed over; broken ones are skipped."""
+    from serve.model_registry import ModelBundle, RegistryWatcher
+    from sklearn.linear_model import LogisticRegression
+
+    rng = np.random.RandomState(0)
+    x = pd.DataFrame(rng.normal(size=(300, 3)), columns=FEATURES)
+    y = (x["amount"] > 0).astype(int)
+
+    swapped = []
+    watcher = RegistryWatcher(tmp_path, on_swap=swapped.append)
+    assert not watcher.poll_once()  # empty registry
+
+    _register(tmp_path, 1, lgb.LGBMClassifier(n_estimators=5, verbose=-1).fit(x, y), threshold=0.3)
+    assert watcher.poll_once()
+    assert swapped[-1].version == 1
+    assert swapped[-1].feature_cols == FEATURES
+    assert swapped[-1].threshold == 0.3
+    assert watcher.last_swap["version"] == 1
+    assert not watcher.poll_once()  # nothing newer
+
+    # A bare estimator without feature names cannot be served — keep v1
+    _register(tmp_path, 2, LogisticRegression().fit(x.values, y))
+    assert not watcher.poll_once()
+    assert watcher.current_version == 1 and 2 in watcher.failed_versions
+
+    # An in-progress write (no metadata.json yet) is ignored
+    (tmp_path / "v3").mkdir()
+    assert not watcher.poll_once()
+
+    old = swapped[-1]
+    _register(tmp_path, 4, lgb.LGBMClassifier(n_estimators=10, verbose=-1).fit(x, y))
+    assert watcher.poll_once()
+    assert swapped[-1].version == 4
+    # A request still holding the old bundle keeps scoring on it
+    assert isinstance(old, ModelBundle) and len(old.score(x.values[:2])) == 2
+
+
+def test_shadow_scorer_collects_agreement_stats():
+    """Shadow scoring should run in the background and compare against the champion."""
+    from serve.model_registry import ModelBundle
+    from serve.shadow import ShadowScorer
+
+    rng = np.random.RandomState(0)
+    x = pd.DataFrame(rng.normal(size=(300, 3)), columns=FEATURES)
+    y = (x["amount"] > 0).astype(int)
+    champion = ModelBundle(
+        lgb.LGBMClassifier(n_estimators=10, verbose=-1).fit(x, y), FEATURES, {}, 0.5, "champ"
+    )
+    # Same model, different column order → alignment must make it agree perfectly
+    reordered = FEATURES[::-1]
+    challenger = ModelBundle(
+        lgb.LGBMClassifier(n_estimators=10, verbose=-1).fit(x[reordered], y), reordered, {}, 0.5, "chall"
+    )
+
+    shadow = ShadowScorer(challenger, fraction=1.0, seed=0)
+    rows = x.values.astype(np.float32)[:50]
+    assert shadow.submit(champion, rows, champion.score(rows)) == 50
+    # A hot-swapped champion replaces the cached column alignment, freeing the old one
+    old = weakref.ref(champion)
+    champion = ModelBundle(champion.model, FEATURES, {}, 0.5, "champ", version=2)
+    assert shadow.submit(champion, rows, champion.score(rows)) == 50
+    shadow.shutdown()
+    gc.collect()
+    assert old() is None and shadow._align_cache[0] is champion
+
+    stats = shadow.stats()
+    assert stats["scored"] == 100 and stats["pending"] == 0
+    assert stats["agreement_rate"] == 1.0
+    assert stats["mean_abs_delta"] < 1e-6
+
+
+def test_compiled_engine_roundtrips_through_memory_mapped_files(tmp_path):
+    """Saved node tables re-open memory-mapped and score identically."""
+    from serve.tree_engine import CompiledTreeEnsemble
+
+    rng = np.random.RandomState(2)
+    x = rng.normal(size=(300, 3))
+    model = lgb.LGBMClassifier(n_estimators=15, verbose=-1).fit(x, (x[:, 0] > 0).astype(int))
+    engine = CompiledTreeEnsemble.from_lgbm(model)
+
+    loaded = CompiledTreeEnsemble.load(engine.save(tmp_path / "engine"))
+    assert isinstance(loaded.threshold, np.memmap)
+    np.testing.assert_array_equal(loaded.predict_proba(x[:20]), engine.predict_proba(x[:20]))
+
+
+def test_shared_bundle_arrays_are_published_once(tmp_path):
+    """Bundles sharing one directory map the same files; staging dirs are cleaned up."""
+    from serve.model_registry import ModelBundle
+
+    rng = np.random.RandomState(3)
+    x = pd.DataFrame(rng.normal(size=(300, 3)), columns=FEATURES)
+    model = lgb.LGBMClassifier(n_estimators=5, verbose=-1).fit(x, (x["amount"] > 0).astype(int))
+    first, second = (
+        ModelBundle(model, FEATURES, x.median().to_dict(), 0.5, "m", version=1, compiled=True)
+        for _ in range(2)
+    )
+
+    shared = [bundle.with_shared_arrays(tmp_path / "v1") for bundle in (first, second)]
+    assert not isinstance(first.median_vector, np.memmap)  # bundles stay immutable
+    first, second = shared
+    assert second.median_vector.filename == first.median_vector.filename
+    assert isinstance(second.engine.threshold, np.memmap)
+    assert [p.name for p in tmp_path.iterdir()] == ["v1"]
+    np.testing.assert_array_equal(second.score(x.values[:5]), model.predict_proba(x)[:5, 1])
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="the pre-fork launcher needs fork()")
+def test_prefork_launcher_workers_serve_shared_bundle(serve_app, tmp_path):
+    """Forked workers come up on one socket and score like the in-process app."""
+    import gc
+
+    import httpx
+    from serve import launcher
+    from serve.model_registry import ModelBundle
+
+    payload = {"features": {"amount": 900.0, "hour": 23}}
+    expected = TestClient(serve_app.app).post("/predict", json=payload).json()["probability"]
+    info = launcher.launch(2, port=0, mmap_dir=tmp_path)
+    try:
+        # The parent stopped its threads before forking and maps the shared tables
+        assert serve_app._log_handler.listener is None
+        assert isinstance(serve_app.BUNDLE.median_vector, np.memmap)
+        url = f"http://127.0.0.1:{info['port']}"
+        for _ in range(4):
+            assert httpx.post(f"{url}/predict", json=payload).json()["probability"] == expected
+        assert httpx.get(f"{url}/health").json()["features"] == len(FEATURES)
+
+        # Hot-swapped bundles are shared through the same directory
+        original = serve_app.BUNDLE
+        swapped = ModelBundle.load(os.environ["FRAUD_ARTEFACT_PATH"])
+        swapped.version = 7
+        serve_app._swap_bundle(swapped)
+        assert Path(serve_app.BUNDLE.median_vector.filename).parent.name == "v7"
+        serve_app._swap_bundle(original)
+    finally:
+        launcher._stop(info["pids"])
+        info["socket"].close()
+        gc.unfreeze()
+        serve_app.SHARED_DIR = None
+        serve_app.start_background()
@@ -28,3 +28,16 @@ def test_champion_challenger_logic():
     # Case 2: Challenger loses
     winner = select_champion(results, prod_metrics_high)
     assert winner is None
+
+
+def test_champion_requires_passing_shadow_check():
+    """An offline winner is only promoted if its shadow-traffic stats look sane."""
+    results = {"NewModel": {"metrics": {"ROC-AUC": 0.95}}}
+    prod_metrics = {"ROC-AUC": 0.90}
+    healthy = {"scored": 5000, "agreement_rate": 0.97, "champion_flag_rate": 0.05, "challenger_flag_rate": 0.06}
+    too_few = {**healthy, "scored": 10}
+    flag_storm = {**healthy, "challenger_flag_rate": 0.40}
+
+    assert select_champion(results, prod_metrics, shadow_stats=healthy) == "NewModel"
+    assert select_champion(results, prod_metrics, shadow_stats=too_few) is None
+    assert select_champion(results, prod_metrics, shadow_stats=flag_storm) is None